@@ -38,21 +38,21 @@ if prompt := st.chat_input("Ex: Quais os precedentes da súmula 70 vigente?"):
         # Chama a função do backend e processa os eventos
         # Esta é a única interação entre o frontend e o backend!
         for event in run_streaming_rag(prompt):
-            if event["type"] == "details":
-                data = event["data"]
+            if event.type == "details":
+                data = event.data
                 query_placeholder.markdown(f"**Busca Semântica:** `{data['query']}`")
                 filter_placeholder.markdown(
                     f"**Filtro de Metadados:** `{data['filter']}`"
                 )
 
-            elif event["type"] == "token":
-                token = event["data"]
+            elif event.type == "token":
+                token = event.data
                 full_answer += token
                 answer_placeholder.markdown(full_answer + "▌")  # O ▌ simula um cursor
 
-            elif event["type"] == "sources":
+            elif event.type == "sources":
                 answer_placeholder.markdown(full_answer)  # Resposta final sem o cursor
-                sources = event["data"]
+                sources = event.data
                 if sources:
                     with st.expander("📚 **Fontes Utilizadas**"):
                         for source in sources:
@@ -1,21 +1,61 @@
-import re
-from typing import Annotated, Any, Dict, Generator, List, TypedDict
+import asyncio
+from functools import partial
+from operator import itemgetter
+from typing import (
+    Annotated,
+    Any,
+    AsyncGenerator,
+    Dict,
+    Generator,
+    List,
+    NamedTuple,
+    Tuple,
+    TypedDict,
+)
 
 from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableConfig
-from langchain_core.structured_query import StructuredQuery
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.structured_query import (
+    Comparator,
+    Comparison,
+    FilterDirective,
+    Operation,
+    Operator,
+    StructuredQuery,
+)
 from langfuse.langchain import CallbackHandler
 from langgraph.graph import END, StateGraph
 from langgraph.graph.message import add_messages
 
 from app.graph.prompt import SYSTEM_PROMPT_JURIDICO
-from app.ingest.embed_qdrant import EmbeddingSelfQuery
-from app.retrieval.retriever import SelfQueryConfig, build_self_query_retriever
+from app.ingest.embed_qdrant import get_embedder
+from app.retrieval.classifier import select_chunk_types
+from app.retrieval.retriever import (
+    SelfQueryConfig,
+    build_self_query_retriever,
+    search_structured,
+)
 
 langfuse_handler = CallbackHandler()
 
+# Instâncias reutilizadas entre as requisições: o embedder carrega o modelo de
+# embeddings, o cliente Qdrant e o LLM apenas uma vez. O cliente Qdrant e os
+# runnables do LangChain são thread-safe, então a mesma chain atende a vários
+# streams simultâneos.
+_EMBEDDER = get_embedder()
+_QA_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_PROMPT_JURIDICO),
+        (
+            "human",
+            "Pergunta: {question}\n\nContexto (trechos):\n{context}\n\nResponda de forma direta. Ao final, liste fontes no formato: (Status da Súmula: metadata.status_atual, Número da Súmula: metadata.num_sumula, Data da Publicação:  metadata.data_status).",
+        ),
+    ]
+)
+_QA_CHAIN = _QA_PROMPT | _EMBEDDER.llm | StrOutputParser()
+
 
 # Definição do Estado do Grafo
 class RAGState(TypedDict):
@@ -42,7 +82,102 @@ class RAGState(TypedDict):
     messages: Annotated[list, add_messages]
 
 
+class RAGEvent(NamedTuple):
+    """
+    Evento emitido pelo fluxo RAG para o frontend.
+
+    Por ser uma tupla, cada token do stream gera uma única alocação pequena; quando for necessário
+    serializar o evento (por exemplo, em uma API HTTP), use `event._asdict()`.
+
+    Attributes:
+        type (str): Tipo do evento: "details", "token" ou "sources".
+        data (Any): Conteúdo do evento: detalhes da busca, um token da resposta ou a lista de fontes.
+    """
+
+    type: str
+    data: Any
+
+
+# Partes fixas da configuração de execução, compartilhadas entre as requisições
+_BASE_RUN_CONFIG = {
+    "callbacks": [langfuse_handler],
+    "run_name": "Chat",
+    "tags": ["live-demo", "sumulas"],
+}
+_RUN_METADATA = {"collection": "sumulas_jornada", "k": 10, "user": "Douglas"}
+
+
 # --- Funções Auxiliares ---
+_COMPARATOR_SYMBOLS = {
+    Comparator.EQ: "=",
+    Comparator.NE: "!=",
+    Comparator.GT: ">",
+    Comparator.GTE: ">=",
+    Comparator.LT: "<",
+    Comparator.LTE: "<=",
+    Comparator.CONTAIN: "contém",
+    Comparator.LIKE: "parecido com",
+    Comparator.IN: "em",
+    Comparator.NIN: "não em",
+}
+_OPERATOR_SEPARATORS = {
+    Operator.AND: " E ",
+    Operator.OR: " OU ",
+    Operator.NOT: " E ",
+}
+
+_DOC_HEADER_FIELDS = itemgetter(
+    "pdf_name", "num_sumula", "chunk_type", "status_atual", "data_status"
+)
+_DOC_HEADER_DEFAULTS = {
+    "pdf_name": "?",
+    "num_sumula": "?",
+    "chunk_type": "chunk",
+    "status_atual": "não informado",
+    "data_status": "não informado",
+}
+
+_SOURCE_KEYS = (
+    "pdf_name",
+    "data_status",
+    "data_status_ano",
+    "status_atual",
+    "num_sumula",
+    "chunk_type",
+)
+_SOURCE_FIELDS = itemgetter(*_SOURCE_KEYS)
+_SOURCE_DEFAULTS = dict.fromkeys(_SOURCE_KEYS)
+
+
+def _walk_filter(filter_obj: FilterDirective, nested: bool = False) -> str:
+    """
+    Percorre a árvore de filtros do LangChain e monta a sua representação textual em uma única passada.
+
+    Args:
+        filter_obj (FilterDirective): Nó da árvore de filtros (`Comparison` ou `Operation`).
+        nested (bool, opcional): Indica se o nó está dentro de outra operação, caso em que é envolvido por parênteses.
+
+    Returns:
+        (str): A representação textual do nó.
+    """
+    if isinstance(filter_obj, Comparison):
+        value = filter_obj.value
+        if isinstance(value, str):
+            value = f"'{value}'"
+        symbol = _COMPARATOR_SYMBOLS[filter_obj.comparator]
+        return f"{filter_obj.attribute} {symbol} {value}"
+
+    if isinstance(filter_obj, Operation):
+        text = _OPERATOR_SEPARATORS[filter_obj.operator].join(
+            _walk_filter(arg, nested=True) for arg in filter_obj.arguments
+        )
+        if filter_obj.operator == Operator.NOT:
+            return f"NÃO ({text})"
+        return f"({text})" if nested else text
+
+    return str(filter_obj)
+
+
 def _format_filter_for_display(filter_obj: Any) -> str:
     """
     Formata o filtro do LangChain para uma exibição mais amigável,
@@ -52,22 +187,64 @@ def _format_filter_for_display(filter_obj: Any) -> str:
         filter_obj (Any): Objeto de filtro que será formatado.
 
     Returns:
-        raw_str (str): A string representando o filtro formatado de forma amigável.
+        (str): A string representando o filtro formatado de forma amigável.
     """
     if not filter_obj:
         return "Nenhum filtro aplicado."
-    raw_str = str(filter_obj)
-    raw_str = re.sub(
-        r"Operation\(operator=<Operator\..*?>,\s*arguments=", "", raw_str
+    return _walk_filter(filter_obj) or "Nenhum filtro aplicado."
+
+
+def _with_chunk_type_filter(question: str, filter_obj: Any) -> FilterDirective:
+    """
+    Acrescenta ao filtro gerado pelo LLM a restrição de tipo de chunk que o retriever aplica a toda busca.
+
+    Assim, o filtro exibido ao usuário mostra também por que precedentes e referências
+    normativas ficam de fora quando a pergunta não os menciona.
+
+    Args:
+        question (str): A pergunta do usuário.
+        filter_obj (Any): Filtro gerado pelo LLM, ou `None` se não houver.
+
+    Returns:
+        (FilterDirective): O filtro completo aplicado na busca.
+    """
+    comparisons = [
+        Comparison(
+            comparator=Comparator.EQ, attribute="chunk_type", value=chunk_type
+        )
+        for chunk_type in select_chunk_types(question)
+    ]
+    chunk_filter = (
+        comparisons[0]
+        if len(comparisons) == 1
+        else Operation(operator=Operator.OR, arguments=comparisons)
+    )
+    if not filter_obj:
+        return chunk_filter
+    return Operation(
+        operator=Operator.AND, arguments=[chunk_filter, filter_obj]
     )
-    raw_str = re.sub(
-        r"Comparator\(attribute='(.*?)',\s*operator=<Comparator\..*?>,\s*value='(.*?)'\)",
-        r"\1 = '\2'",
-        raw_str,
+
+
+def _format_doc(d: Document) -> str:
+    """
+    Formata um único documento com o cabeçalho de metadados seguido do conteúdo.
+
+    Args:
+        d (Document): Documento a ser formatado.
+
+    Returns:
+        (str): O cabeçalho de metadados e o conteúdo do documento.
+    """
+    pdf_name, num_sumula, chunk_type, status_atual, data_status = (
+        _DOC_HEADER_FIELDS({**_DOC_HEADER_DEFAULTS, **(d.metadata or {})})
+    )
+    return (
+        f"[{pdf_name} | Súmula {num_sumula} | {chunk_type}]"
+        f"\nstatus_atual: {status_atual}"
+        f"\ndata_status: {data_status}"
+        f"\n\n{d.page_content}"
     )
-    raw_str = raw_str.replace("[", "").replace("]", "").replace("),", " E ")
-    raw_str = raw_str.strip("()")
-    return raw_str if raw_str else "Nenhum filtro aplicado."
 
 
 def _format_docs(docs: List[Document]) -> str:
@@ -81,16 +258,7 @@ def _format_docs(docs: List[Document]) -> str:
     Returns:
         (str): A string representando os documentos formatados.
     """
-    parts = []
-    for d in docs:
-        md = d.metadata or {}
-        head = (
-            f"[{md.get('pdf_name', '?')} | Súmula {md.get('num_sumula', '?')} | {md.get('chunk_type', 'chunk')}]"
-            f"\nstatus_atual: {md.get('status_atual', 'não informado')}"
-            f"\ndata_status: {md.get('data_status', 'não informado')}"
-        )
-        parts.append(f"{head}\n\n{d.page_content}")
-    return "\n\n---\n\n".join(parts)
+    return "\n\n---\n\n".join(map(_format_doc, docs))
 
 
 # --- Nós do Grafo ---
@@ -113,20 +281,63 @@ def retrieve(
         (Dict[str, Any]): Um dicionário contendo os documentos recuperados, a consulta gerada e o filtro formatado.
     """
     print("Executando o nó de recuperação...")
-    cfg = SelfQueryConfig(collection_name=collection_name, k=k)
-    retriever = build_self_query_retriever(cfg)
+    retriever = build_self_query_retriever(
+        SelfQueryConfig(collection_name=collection_name, k=k)
+    )
+
+    # A consulta estruturada é gerada uma única vez (ou lida do cache) e
+    # reaproveitada na busca, evitando que `retriever.invoke` chame o LLM novamente.
+    structured_query: StructuredQuery = retriever.construct_query(
+        state["question"], config=config
+    )
+    docs = search_structured(retriever, state["question"], structured_query)
+
+    print(f"Busca finalizada. Encontrados {len(docs)} documentos.")
+    return {
+        "docs": docs,
+        "generated_query": structured_query.query,
+        "generated_filter": _format_filter_for_display(
+            _with_chunk_type_filter(state["question"], structured_query.filter)
+        ),
+    }
+
+
+async def aretrieve(
+    state: RAGState,
+    config: RunnableConfig,
+    collection_name: str = "sumulas_jornada",
+    k: int = 10,
+) -> Dict[str, Any]:
+    """
+    Versão assíncrona de `retrieve`, usada quando o grafo é executado com `astream`.
+
+    Args:
+        state (RAGState): O estado atual do grafo, incluindo a pergunta e documentos.
+        config (RunnableConfig): Configuração para execução do grafo.
+        collection_name (str, opcional): Nome da coleção de dados a ser consultada. Padrão é "sumulas_jornada".
+        k (int, opcional): Número de resultados a serem retornados pela consulta. Padrão é 10.
+
+    Returns:
+        (Dict[str, Any]): Um dicionário contendo os documentos recuperados, a consulta gerada e o filtro formatado.
+    """
+    print("Executando o nó de recuperação...")
+    retriever = build_self_query_retriever(
+        SelfQueryConfig(collection_name=collection_name, k=k)
+    )
 
-    structured_query: StructuredQuery = retriever.query_constructor.invoke(
-        {"query": state["question"]}, config=config
+    structured_query: StructuredQuery = await retriever.aconstruct_query(
+        state["question"], config=config
+    )
+    docs = await asyncio.to_thread(
+        search_structured, retriever, state["question"], structured_query
     )
-    docs = retriever.invoke(state["question"], config=config)
 
     print(f"Busca finalizada. Encontrados {len(docs)} documentos.")
     return {
         "docs": docs,
         "generated_query": structured_query.query,
         "generated_filter": _format_filter_for_display(
-            structured_query.filter
+            _with_chunk_type_filter(state["question"], structured_query.filter)
         ),
     }
 
@@ -143,22 +354,32 @@ def generate_stream(state: RAGState, config: RunnableConfig) -> Dict[str, Any]:
         (Dict[str, Any]): Um dicionário contendo o fluxo de resposta gerado.
     """
     print("Executando o nó de geração...")
-    QA_PROMPT = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_PROMPT_JURIDICO),
-            (
-                "human",
-                "Pergunta: {question}\n\nContexto (trechos):\n{context}\n\nResponda de forma direta. Ao final, liste fontes no formato: (Status da Súmula: metadata.status_atual, Número da Súmula: metadata.num_sumula, Data da Publicação:  metadata.data_status).",
-            ),
-        ]
+    context = _format_docs(state.get("docs", []))
+
+    answer_stream = _QA_CHAIN.stream(
+        {"question": state["question"], "context": context},
+        config=config,
     )
+    return {"answer": answer_stream}
+
+
+async def agenerate_stream(
+    state: RAGState, config: RunnableConfig
+) -> Dict[str, Any]:
+    """
+    Versão assíncrona de `generate_stream`, que retorna um iterador assíncrono de tokens.
+
+    Args:
+        state (RAGState): O estado atual do grafo, incluindo a pergunta e documentos.
+        config (RunnableConfig): Configuração para execução do grafo.
 
-    embedder = EmbeddingSelfQuery()
-    llm = embedder.llm
+    Returns:
+        (Dict[str, Any]): Um dicionário contendo o fluxo assíncrono de resposta gerado.
+    """
+    print("Executando o nó de geração...")
     context = _format_docs(state.get("docs", []))
-    chain = QA_PROMPT | llm | StrOutputParser()
 
-    answer_stream = chain.stream(
+    answer_stream = _QA_CHAIN.astream(
         {"question": state["question"], "context": context},
         config=config,
     )
@@ -180,13 +401,18 @@ def build_streaming_graph(
         (StateGraph): O grafo compilado com os nós configurados.
     """
     graph = StateGraph(RAGState)
+    # Cada nó possui uma versão síncrona e uma assíncrona, permitindo executar
+    # o mesmo grafo com `stream` ou `astream`.
     graph.add_node(
         "retrieve",
-        lambda s, config: retrieve(
-            s, config=config, collection_name=collection_name, k=k
+        RunnableLambda(
+            partial(retrieve, collection_name=collection_name, k=k),
+            afunc=partial(aretrieve, collection_name=collection_name, k=k),
         ),
     )
-    graph.add_node("generate", generate_stream)
+    graph.add_node(
+        "generate", RunnableLambda(generate_stream, afunc=agenerate_stream)
+    )
     graph.set_entry_point("retrieve")
     graph.add_edge("retrieve", "generate")
     graph.add_edge("generate", END)
@@ -197,61 +423,120 @@ def build_streaming_graph(
 COMPILED_GRAPH = build_streaming_graph()
 
 
-# --- Função Principal (Ponto de Entrada para o Frontend) ---
-def run_streaming_rag(question: str) -> Generator[Dict[str, Any], None, None]:
+def _prepare_run(question: str) -> Tuple[RAGState, RunnableConfig]:
     """
-    Função de alto nível que executa o fluxo RAG e retorna um gerador de eventos para o frontend.
+    Monta o estado inicial e a configuração de execução do grafo para uma pergunta.
 
     Args:
         question (str): A pergunta a ser processada pelo grafo.
 
     Returns:
-        (Generator[Dict[str, Any], None, None]): Um gerador que emite eventos em formato de dicionário durante o fluxo.
+        (Tuple[RAGState, RunnableConfig]): O estado inicial do grafo e a configuração de execução.
     """
-
-    # run_config = {"callbacks": [langfuse_handler], "run_name": "Chat"}
     run_config = RunnableConfig(
-        callbacks=[langfuse_handler],
-        run_name="Chat",
-        tags=["live-demo", "sumulas"],
-        metadata={"collection": "sumulas_jornada", "k": 10, "user": "Douglas"},
+        **_BASE_RUN_CONFIG, metadata=dict(_RUN_METADATA)
     )
 
     initial_state: RAGState = {"question": question, "messages": []}
-    final_state = {}
+    return initial_state, run_config
+
+
+def _build_sources(docs: List[Document]) -> List[Dict[str, Any]]:
+    """
+    Extrai os metadados das fontes utilizadas a partir dos documentos recuperados.
+
+    Args:
+        docs (List[Document]): Os documentos retornados pelo nó de recuperação.
+
+    Returns:
+        (List[Dict[str, Any]]): Lista com os metadados de cada documento recuperado.
+    """
+    return [
+        dict(
+            zip(
+                _SOURCE_KEYS,
+                _SOURCE_FIELDS({**_SOURCE_DEFAULTS, **d.metadata}),
+            )
+        )
+        for d in docs
+    ]
+
+
+# --- Função Principal (Ponto de Entrada para o Frontend) ---
+def run_streaming_rag(question: str) -> Generator[RAGEvent, None, None]:
+    """
+    Função de alto nível que executa o fluxo RAG e retorna um gerador de eventos para o frontend.
+
+    Args:
+        question (str): A pergunta a ser processada pelo grafo.
+
+    Returns:
+        (Generator[RAGEvent, None, None]): Um gerador que emite eventos (`RAGEvent`) durante o fluxo.
+    """
+
+    initial_state, run_config = _prepare_run(question)
+    # No modo de stream padrão ("updates"), o grafo emite a saída de cada nó,
+    # mas nunca um evento de END: as fontes vêm da saída do nó de recuperação.
+    docs: List[Document] = []
 
     # Executa o grafo em modo streaming
     for event in COMPILED_GRAPH.stream(initial_state, config=run_config):
         if "retrieve" in event:
             output = event["retrieve"]
-            yield {
-                "type": "details",
-                "data": {
+            docs = output["docs"]
+            yield RAGEvent(
+                "details",
+                {
                     "query": output["generated_query"],
                     "filter": output["generated_filter"],
                 },
-            }
+            )
 
         if "generate" in event:
             answer_stream = event["generate"]["answer"]
             # Itera sobre o gerador de tokens da resposta
             for token in answer_stream:
-                yield {"type": "token", "data": token}
-
-        if END in event:
-            final_state = event[END]
+                yield RAGEvent("token", token)
 
     # Formata e retorna as fontes no final do fluxo
-    docs = final_state.get("docs", [])
-    sources = [
-        {
-            "pdf_name": d.metadata.get("pdf_name"),
-            "data_status": d.metadata.get("data_status"),
-            "data_status_ano": d.metadata.get("data_status_ano"),
-            "status_atual": d.metadata.get("status_atual"),
-            "num_sumula": d.metadata.get("num_sumula"),
-            "chunk_type": d.metadata.get("chunk_type"),
-        }
-        for d in docs
-    ]
-    yield {"type": "sources", "data": sources}
+    yield RAGEvent("sources", _build_sources(docs))
+
+
+async def run_streaming_rag_async(
+    question: str,
+) -> AsyncGenerator[RAGEvent, None]:
+    """
+    Versão assíncrona de `run_streaming_rag`, que executa o grafo com `astream`.
+
+    As chamadas ao LLM e ao Qdrant não bloqueiam o event loop, permitindo que
+    várias perguntas sejam atendidas de forma concorrente.
+
+    Args:
+        question (str): A pergunta a ser processada pelo grafo.
+
+    Returns:
+        (AsyncGenerator[RAGEvent, None]): Um gerador assíncrono que emite os mesmos eventos de `run_streaming_rag`.
+    """
+    initial_state, run_config = _prepare_run(question)
+    # As fontes vêm da saída do nó de recuperação (ver `run_streaming_rag`).
+    docs: List[Document] = []
+
+    async for event in COMPILED_GRAPH.astream(
+        initial_state, config=run_config
+    ):
+        if "retrieve" in event:
+            output = event["retrieve"]
+            docs = output["docs"]
+            yield RAGEvent(
+                "details",
+                {
+                    "query": output["generated_query"],
+                    "filter": output["generated_filter"],
+                },
+            )
+
+        if "generate" in event:
+            async for token in event["generate"]["answer"]:
+                yield RAGEvent("token", token)
+
+    yield RAGEvent("sources", _build_sources(docs))
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Optional
+
+from loguru import logger
+
+# Formatos aceitos para a data de status extraída pelo LLM
+DATE_FORMATS = ("%d/%m/%y", "%d/%m/%Y")
+
+
+def date_to_int(data_status: Optional[str]) -> Optional[int]:
+    """
+    Converte a data textual 'DD/MM/AA' (ou 'DD/MM/AAAA') em um inteiro no formato AAAAMMDD.
+
+    O inteiro preserva a ordem cronológica, então o self-query pode filtrar datas com
+    comparações numéricas (lt, gt, lte, gte) sobre um índice de payload `integer`.
+    Datas que não puderem ser interpretadas geram um aviso no log, pois a súmula deixa
+    de aparecer nos filtros por data.
+
+    Args:
+        data_status (Optional[str]): A data no formato 'DD/MM/AA' ou 'DD/MM/AAAA' (ex.: '07/04/14').
+
+    Returns:
+        (Optional[int]): A data no formato AAAAMMDD (ex.: 20140407), ou None se a data for inválida.
+    """
+    if data_status:
+        # '%y' vem primeiro: com '%Y', '07/04/14' seria lido como o ano 14.
+        # Anos de dois dígitos de 69 a 99 ficam no século XX ('87' -> 1987).
+        for date_format in DATE_FORMATS:
+            try:
+                data = datetime.strptime(data_status.strip(), date_format)
+            except ValueError:
+                continue
+            return data.year * 10000 + data.month * 100 + data.day
+    logger.warning(
+        f"Data de status inválida: {data_status!r}. "
+        "A súmula não aparecerá nos filtros por data."
+    )
+    return None
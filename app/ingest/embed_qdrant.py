@@ -1,10 +1,109 @@
+import os
+from functools import lru_cache
+from typing import Dict, List
+
 from langchain.chat_models import init_chat_model
 from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
-from langchain_qdrant import QdrantVectorStore
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import FastEmbedSparse, QdrantVectorStore, RetrievalMode
+from langchain_qdrant.sparse_embeddings import SparseEmbeddings, SparseVector
 from qdrant_client import QdrantClient
 
+from app.utils.cache import LRUCache
 from app.utils.settings import settings
 
+# Limite das mensagens gRPC (envio e recebimento). O padrão do gRPC, 4 MB,
+# é pequeno para lotes grandes de upsert e respostas com muitos payloads.
+GRPC_MAX_MESSAGE_LENGTH = 64 * 1024 * 1024
+
+# Número de consultas cujos embeddings são mantidos em memória.
+QUERY_EMBEDDING_CACHE_SIZE = 4096
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings densos que reaproveitam o vetor de consultas repetidas.
+
+    Perguntas de acompanhamento e consultas reformuladas de forma idêntica pelo self-query
+    não são calculadas novamente. Os embeddings de documentos não passam pelo cache.
+
+    Args:
+        embeddings (Embeddings): O modelo de embeddings envolvido.
+        maxsize (int, opcional): Número máximo de consultas em cache. Padrão é `QUERY_EMBEDDING_CACHE_SIZE`.
+    """
+
+    def __init__(
+        self, embeddings: Embeddings, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE
+    ) -> None:
+        self.embeddings = embeddings
+        self._cache = LRUCache(maxsize)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Calcula os embeddings densos dos documentos, sem passar pelo cache.
+
+        Args:
+            texts (List[str]): Os textos dos documentos.
+
+        Returns:
+            (List[List[float]]): Os embeddings densos, na mesma ordem dos textos.
+        """
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Retorna o embedding denso da consulta, calculando-o só na primeira vez.
+
+        Args:
+            text (str): O texto da consulta.
+
+        Returns:
+            (List[float]): O embedding denso da consulta.
+        """
+        return self._cache.get_or_compute(text, self.embeddings.embed_query)
+
+
+class CachedSparseEmbeddings(SparseEmbeddings):
+    """
+    Versão de `CachedEmbeddings` para os embeddings esparsos (BM25) da busca híbrida.
+
+    Args:
+        embeddings (SparseEmbeddings): O modelo de embeddings esparsos envolvido.
+        maxsize (int, opcional): Número máximo de consultas em cache. Padrão é `QUERY_EMBEDDING_CACHE_SIZE`.
+    """
+
+    def __init__(
+        self,
+        embeddings: SparseEmbeddings,
+        maxsize: int = QUERY_EMBEDDING_CACHE_SIZE,
+    ) -> None:
+        self.embeddings = embeddings
+        self._cache = LRUCache(maxsize)
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        """
+        Calcula os embeddings esparsos dos documentos, sem passar pelo cache.
+
+        Args:
+            texts (List[str]): Os textos dos documentos.
+
+        Returns:
+            (List[SparseVector]): Os embeddings esparsos, na mesma ordem dos textos.
+        """
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> SparseVector:
+        """
+        Retorna o embedding esparso da consulta, calculando-o só na primeira vez.
+
+        Args:
+            text (str): O texto da consulta.
+
+        Returns:
+            (SparseVector): O embedding esparso da consulta.
+        """
+        return self._cache.get_or_compute(text, self.embeddings.embed_query)
+
 
 class EmbeddingSelfQuery:
     """
@@ -17,6 +116,9 @@ class EmbeddingSelfQuery:
         llm (BaseChatModel): O modelo de linguagem inicializado para gerar respostas baseadas em consultas.
         client (QdrantClient): O cliente Qdrant usado para interagir com o banco de dados Qdrant.
         model (FastEmbedEmbeddings): O modelo de embeddings que converte texto em representações vetoriais.
+        sparse_model (FastEmbedSparse): O modelo BM25 que gera os vetores esparsos usados na busca híbrida.
+        query_model (CachedEmbeddings): `model` com cache dos embeddings de consultas repetidas.
+        sparse_query_model (CachedSparseEmbeddings): `sparse_model` com cache dos embeddings de consultas repetidas.
     """
 
     def __init__(self) -> None:
@@ -24,21 +126,55 @@ class EmbeddingSelfQuery:
         Inicializa o modelo de linguagem, o cliente Qdrant e o modelo de embeddings.
 
         O modelo de linguagem é inicializado com configurações definidas nas variáveis de ambiente.
-        O cliente Qdrant é configurado com os parâmetros de host e porta definidos nas configurações.
-        O modelo de embeddings é inicializado para conversões de texto em vetores de alta qualidade.
+        O cliente Qdrant é configurado com os parâmetros de host e porta definidos nas configurações,
+        dando preferência ao transporte gRPC.
+        O modelo de embeddings é inicializado para conversões de texto em vetores de alta qualidade,
+        usando todos os núcleos disponíveis nas sessões do ONNX Runtime.
+        O modelo esparso (BM25) é inicializado para a busca híbrida.
         """
 
         self.llm = init_chat_model(
             model=settings.MODEL_NAME,
             temperature=settings.TEMPERATURE,
         )
+        # gRPC usa protobuf binário e uma conexão persistente, evitando a
+        # serialização JSON e novos handshakes HTTP a cada busca ou upsert.
+        # O canal HTTP/2 multiplexa as chamadas concorrentes, e o keepalive
+        # evita que ele seja derrubado entre uma pergunta e outra.
         self.client = QdrantClient(
             host=settings.QDRANT_HOST,
             port=settings.QDRANT_PORT,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            prefer_grpc=True,
             timeout=120,
+            grpc_options={
+                "grpc.max_send_message_length": GRPC_MAX_MESSAGE_LENGTH,
+                "grpc.max_receive_message_length": GRPC_MAX_MESSAGE_LENGTH,
+                "grpc.keepalive_time_ms": 30_000,
+                "grpc.keepalive_permit_without_calls": 1,
+            },
         )
+        self._vector_stores: Dict[str, QdrantVectorStore] = {}
 
-        self.model = FastEmbedEmbeddings(model_name=settings.EMBEDDINGS_NAME)
+        # Os chunks das súmulas são curtos: lotes menores com todas as threads
+        # do ONNX Runtime aproveitam melhor a CPU do que o lote padrão de 256.
+        self.model = FastEmbedEmbeddings(
+            model_name=settings.EMBEDDINGS_NAME,
+            threads=os.cpu_count(),
+            batch_size=64,
+        )
+        # Embeddings esparsos BM25 para a busca híbrida, que recupera bem
+        # termos exatos (números de súmula, citações legais) que o modelo
+        # denso tende a diluir. O stemmer e as stopwords seguem o idioma das
+        # súmulas (o padrão do BM25 do FastEmbed é o inglês).
+        self.sparse_model = FastEmbedSparse(
+            model_name=settings.SPARSE_EMBEDDINGS_NAME,
+            threads=os.cpu_count(),
+            language=settings.SPARSE_EMBEDDINGS_LANGUAGE,
+        )
+        # O vector store usa versões com cache dos embeddings de consulta.
+        self.query_model = CachedEmbeddings(self.model)
+        self.sparse_query_model = CachedSparseEmbeddings(self.sparse_model)
 
     def get_qdrant_vector_store(
         self, collection_name: str
@@ -47,16 +183,38 @@ class EmbeddingSelfQuery:
         Retorna uma instância do `QdrantVectorStore` configurada com o cliente Qdrant,
         o modelo de embeddings e os parâmetros da coleção.
 
+        As instâncias são criadas uma vez por coleção e todas compartilham o mesmo cliente Qdrant.
+        O vector store opera no modo híbrido: grava e busca tanto o vetor denso quanto o esparso (BM25).
+
         Args:
             collection_name (str): Nome da coleção onde os vetores serão armazenados no Qdrant.
 
         Returns:
             (QdrantVectorStore): A instância configurada do `QdrantVectorStore`.
         """
-        return QdrantVectorStore(
-            client=self.client,
-            collection_name=collection_name,
-            embedding=self.model,
-            sparse_vector_name="text-sparse",
-            vector_name="text-dense",
-        )
+        vector_store = self._vector_stores.get(collection_name)
+        if vector_store is None:
+            vector_store = QdrantVectorStore(
+                client=self.client,
+                collection_name=collection_name,
+                embedding=self.query_model,
+                sparse_embedding=self.sparse_query_model,
+                retrieval_mode=RetrievalMode.HYBRID,
+                sparse_vector_name="text-sparse",
+                vector_name="text-dense",
+            )
+            self._vector_stores[collection_name] = vector_store
+        return vector_store
+
+
+@lru_cache(maxsize=1)
+def get_embedder() -> EmbeddingSelfQuery:
+    """
+    Retorna a instância única de `EmbeddingSelfQuery` compartilhada por todo o processo.
+
+    O modelo de embeddings, o cliente Qdrant e o LLM são carregados apenas na primeira chamada.
+
+    Returns:
+        (EmbeddingSelfQuery): A instância compartilhada.
+    """
+    return EmbeddingSelfQuery()
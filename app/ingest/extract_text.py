@@ -1,21 +1,191 @@
-import json
+import hashlib
 import os
-import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Union
 
+import tiktoken
+from langchain_core.messages import BaseMessage
+from langchain_qdrant import QdrantVectorStore
 from loguru import logger
 from markitdown import MarkItDown
 from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
     Distance,
+    HnswConfigDiff,
+    Modifier,
+    QuantizationConfig,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
     SparseVectorParams,
     VectorParams,
 )
 
 from app.graph.prompt import PROMPT_EXTRACT
-from app.ingest.embed_qdrant import EmbeddingSelfQuery
+from app.ingest.dates import date_to_int
+from app.ingest.embed_qdrant import EmbeddingSelfQuery, get_embedder
+from app.retrieval.fastpath import normalize_num_sumula
+from app.retrieval.self_query import ensure_payload_indexes
+from app.utils.settings import settings
+
+try:
+    # orjson é bem mais rápido que o json da biblioteca padrão, mas é opcional
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 md = MarkItDown()
+encoding = tiktoken.get_encoding("cl100k_base")
+
+# Diretório onde o markdown extraído de cada PDF é armazenado entre execuções
+CACHE_DIR = Path(".cache")
+# Número máximo de tokens do texto da súmula enviado no prompt de extração
+MAX_TEXT_TOKENS = 4000
+
+# Número de PDFs enviados ao modelo de linguagem em cada chamada de `batch`
+EXTRACT_BATCH_SIZE = 32
+# Número máximo de requisições simultâneas ao modelo de linguagem
+MAX_CONCURRENCY = 8
+# Número de chunks acumulados antes de gerar os embeddings e enviar ao Qdrant
+UPSERT_BATCH_SIZE = 256
+
+
+def _convert_to_markdown(file_path: str) -> str:
+    """
+    Converte o PDF para markdown, reaproveitando o resultado salvo em `CACHE_DIR` quando o arquivo não mudou.
+
+    O cache é indexado pelo hash SHA-1 do conteúdo do arquivo, então execuções
+    seguintes da ingestão não precisam chamar `md.convert` novamente.
+
+    Args:
+        file_path (str): Caminho para o arquivo PDF que será convertido.
+
+    Returns:
+        (str): O texto do PDF em markdown.
+    """
+    key = hashlib.sha1(Path(file_path).read_bytes()).hexdigest()
+    cache_file = CACHE_DIR / f"{key}.md"
+    if cache_file.exists():
+        return cache_file.read_text(encoding="utf-8")
+
+    result = md.convert(str(file_path))
+    text_content = result.text_content or ""
+
+    # Grava num arquivo temporário e renomeia: `os.replace` é atômico, então
+    # uma ingestão interrompida nunca deixa um `.md` truncado no cache.
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+            tmp_file.write(text_content)
+        os.replace(tmp_name, cache_file)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return text_content
+
+
+def _truncate_tokens(text: str, max_tokens: int = MAX_TEXT_TOKENS) -> str:
+    """
+    Limita o texto a um número máximo de tokens, em vez de um número fixo de caracteres.
+
+    Args:
+        text (str): O texto a ser truncado.
+        max_tokens (int, opcional): Número máximo de tokens mantidos. Padrão é `MAX_TEXT_TOKENS`.
+
+    Returns:
+        (str): O texto com no máximo `max_tokens` tokens.
+    """
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def _build_extract_prompt(pdf_name: str, text_content: str) -> str:
+    """
+    Monta o prompt de extração de metadados e chunks a partir do texto do PDF.
+
+    Args:
+        pdf_name (str): Nome do arquivo PDF que será processado.
+        text_content (str): O texto do PDF em markdown.
+
+    Returns:
+        (str): O prompt formatado para o modelo de linguagem.
+    """
+    return PROMPT_EXTRACT.format(
+        pdf_name=pdf_name, text_content=_truncate_tokens(text_content)
+    )
+
+
+def _strip_code_fence(text: str) -> str:
+    """
+    Remove o bloco de código markdown (```json ... ```) que envolve a resposta do LLM.
+
+    Args:
+        text (str): O conteúdo retornado pelo modelo de linguagem.
+
+    Returns:
+        (str): O conteúdo sem as marcações de bloco de código.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.partition("\n")[2]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _parse_extract_response(
+    response: Union[BaseMessage, Exception], pdf_name: str
+) -> List[Dict[str, Any]]:
+    """
+    Interpreta a resposta do modelo de linguagem, convertendo o JSON retornado em chunks com metadados.
+
+    Args:
+        response (Union[BaseMessage, Exception]): A mensagem retornada pelo modelo ou a exceção lançada na chamada.
+        pdf_name (str): Nome do arquivo PDF de origem da resposta.
+
+    Returns:
+        processed (List[Dict[str, Any]]): Uma lista de dicionários contendo os textos dos chunks e seus respectivos metadados.
+            Retorna uma lista vazia caso a resposta seja inválida.
+    """
+    try:
+        if isinstance(response, Exception):
+            raise response
+
+        data = json_loads(_strip_code_fence(response.content))
+
+        metadados = data.get("metadados", {})
+        chunks = data.get("chunks", {})
+
+        processed = []
+        for idx, (tipo, texto) in enumerate(chunks.items()):
+            if not texto or idx >= 3:
+                continue
+            metadata = {
+                "num_sumula": normalize_num_sumula(
+                    metadados.get("num_sumula")
+                ),
+                "data_status": metadados.get("data_status"),
+                "data_status_ano": int(metadados.get("data_status_ano")),
+                "data_status_num": date_to_int(metadados.get("data_status")),
+                "status_atual": metadados.get("status_atual"),
+                "pdf_name": metadados.get("pdf_name", pdf_name),
+                "chunk_type": tipo,
+                "chunk_index": idx,
+            }
+            processed.append({"text": texto.strip(), "metadata": metadata})
+
+        return processed
+
+    except Exception as e:
+        logger.error(f"⚠️ Erro ao processar {pdf_name}: {e}")
+        return []
 
 
 def process_pdf_file(
@@ -56,46 +226,45 @@ def process_pdf_file(
     """
 
     pdf_name = os.path.basename(file_path)
-    result = md.convert(str(file_path))
-    text_content = result.text_content or ""
-
-    # Prompt de extração
-    prompt = PROMPT_EXTRACT.format(
-        pdf_name=pdf_name, text_content=text_content[:12000]
-    )
-
+    prompt = _build_extract_prompt(pdf_name, _convert_to_markdown(file_path))
     try:
         response = embedder.llm.invoke(prompt)
-        json_text = (
-            re.sub(r"```[\w-]*", "", response.content)
-            .replace("```", "")
-            .strip()
-        )
-        data = json.loads(json_text)
+    except Exception as e:
+        response = e
+    return _parse_extract_response(response, pdf_name)
 
-        metadados = data.get("metadados", {})
-        chunks = data.get("chunks", {})
 
-        processed = []
-        for idx, (tipo, texto) in enumerate(chunks.items()):
-            if not texto or idx >= 3:
-                continue
-            metadata = {
-                "num_sumula": metadados.get("num_sumula"),
-                "data_status": metadados.get("data_status"),
-                "data_status_ano": int(metadados.get("data_status_ano")),
-                "status_atual": metadados.get("status_atual"),
-                "pdf_name": metadados.get("pdf_name", pdf_name),
-                "chunk_type": tipo,
-                "chunk_index": idx,
-            }
-            processed.append({"text": texto.strip(), "metadata": metadata})
+def _quantization_config() -> Optional[QuantizationConfig]:
+    """
+    Monta a quantização dos vetores densos definida em `settings.QUANTIZATION`.
 
-        return processed
+    A quantização escalar (int8) reduz a memória em ~4x mantendo boa qualidade; a binária
+    reduz em ~32x e é a mais rápida, dependendo mais do rescore com os vetores originais.
 
-    except Exception as e:
-        logger.error(f"⚠️ Erro ao processar {pdf_name}: {e}")
-        return []
+    Returns:
+        (Optional[QuantizationConfig]): A configuração de quantização, ou None se desativada.
+
+    Raises:
+        ValueError: Se `settings.QUANTIZATION` não for "scalar", "binary" ou "none".
+    """
+    if settings.QUANTIZATION == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            )
+        )
+    if settings.QUANTIZATION == "binary":
+        return BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=True)
+        )
+    if settings.QUANTIZATION == "none":
+        return None
+    raise ValueError(
+        f"QUANTIZATION inválida: '{settings.QUANTIZATION}'. "
+        "Use 'scalar', 'binary' ou 'none'."
+    )
 
 
 def create_collection_if_not_exists(
@@ -105,32 +274,88 @@ def create_collection_if_not_exists(
     Cria uma coleção no Qdrant se ela não existir, configurando os parâmetros para vetores densos e esparsos.
 
     A função verifica se a coleção especificada já existe no Qdrant. Se não existir, cria a coleção com as configurações adequadas
-    para vetores densos e esparsos, usando o modelo de embeddings configurado no `embedder`.
+    para vetores densos e esparsos, usando o modelo de embeddings configurado no `embedder`, a quantização dos vetores densos definida em `settings.QUANTIZATION`
+    e o índice HNSW configurado por `settings.HNSW_M` e `settings.HNSW_EF_CONSTRUCT`.
+    Se a coleção já existir, verifica se o tamanho dos vetores densos é compatível com o modelo de embeddings atual.
+    Em seguida, garante que os índices de payload dos campos de metadados existam.
 
     Args:
         embedder (EmbeddingSelfQuery): O objeto que contém o cliente Qdrant e o modelo de embeddings.
         collection (str): O nome da coleção a ser criada ou verificada.
+
+    Raises:
+        ValueError: Se a coleção existente usar vetores de tamanho diferente do modelo de embeddings.
     """
 
     # Cria coleção se não existir
 
+    embedding_size = embedder.model.model.embedding_size
     if embedder.client.collection_exists(collection_name=collection):
         logger.info(f"Coleção '{collection}' já existe.")
-        return
-
-    embedder.client.create_collection(
-        collection_name=collection,
-        vectors_config={
-            "text-dense": VectorParams(
-                size=embedder.model.model.embedding_size,
-                distance=Distance.COSINE,
+        vectors = embedder.client.get_collection(
+            collection
+        ).config.params.vectors
+        if vectors["text-dense"].size != embedding_size:
+            raise ValueError(
+                f"A coleção '{collection}' usa vetores de tamanho "
+                f"{vectors['text-dense'].size}, mas o modelo "
+                f"'{settings.EMBEDDINGS_NAME}' gera vetores de tamanho "
+                f"{embedding_size}. Use uma nova coleção ou recrie a atual."
             )
-        },
-        sparse_vectors_config={
-            "text-sparse": SparseVectorParams()  # sem size para esparso
-        },
+    else:
+        embedder.client.create_collection(
+            collection_name=collection,
+            vectors_config={
+                # Com quantização, os vetores originais só são lidos no
+                # rescore e podem ficar em disco; os quantizados ficam em RAM.
+                "text-dense": VectorParams(
+                    size=embedding_size,
+                    distance=Distance.COSINE,
+                    on_disk=settings.QUANTIZATION != "none",
+                )
+            },
+            sparse_vectors_config={
+                # Sem size para esparso; o BM25 depende do IDF calculado
+                # pelo Qdrant sobre a coleção.
+                "text-sparse": SparseVectorParams(modifier=Modifier.IDF)
+            },
+            quantization_config=_quantization_config(),
+            # Grafo HNSW mais denso e mantido em RAM, assim como o payload
+            # lido pelos filtros do self-query: a coleção é pequena e a
+            # carga é dominada por leituras.
+            hnsw_config=HnswConfigDiff(
+                m=settings.HNSW_M,
+                ef_construct=settings.HNSW_EF_CONSTRUCT,
+                full_scan_threshold=10000,
+                on_disk=False,
+            ),
+            on_disk_payload=False,
+        )
+        logger.info(f"Coleção '{collection}' criada.")
+
+    ensure_payload_indexes(embedder.client, collection)
+
+
+def _flush_chunks(
+    vector_store: QdrantVectorStore,
+    texts: List[str],
+    metadatas: List[Dict[str, Any]],
+) -> None:
+    """
+    Envia os chunks acumulados ao Qdrant em uma única chamada e esvazia as listas.
+
+    Args:
+        vector_store (QdrantVectorStore): O vector store onde os textos serão inseridos.
+        texts (List[str]): Textos dos chunks acumulados.
+        metadatas (List[Dict[str, Any]]): Metadados correspondentes a cada texto.
+    """
+    if not texts:
+        return
+    vector_store.add_texts(
+        texts=texts, metadatas=metadatas, batch_size=UPSERT_BATCH_SIZE
     )
-    logger.info(f"Coleção '{collection}' criada.")
+    texts.clear()
+    metadatas.clear()
 
 
 def main(
@@ -142,7 +367,7 @@ def main(
 
     Esta função:
     1. Verifica e cria a coleção no Qdrant se não existir.
-    2. Processa os arquivos PDF da pasta especificada, extraindo os chunks e metadados.
+    2. Processa os arquivos PDF da pasta especificada em lotes, convertendo-os em paralelo em um pool de processos e enviando os prompts de extração ao LLM em paralelo.
     3. Adiciona os textos e metadados ao Qdrant.
 
     Args:
@@ -151,7 +376,7 @@ def main(
 
     """
 
-    embedder = EmbeddingSelfQuery()
+    embedder = get_embedder()
 
     create_collection_if_not_exists(embedder, collection)
 
@@ -162,16 +387,45 @@ def main(
         return
 
     total_chunks = 0
-    for pdf_file in pdf_files:
-        logger.debug(f"Processando {pdf_file.name}.")
-        chunks = process_pdf_file(str(pdf_file), embedder)
-        if not chunks:
-            continue
-        texts = [c["text"] for c in chunks]
-        metadatas = [c["metadata"] for c in chunks]
-        vector_store.add_texts(texts=texts, metadatas=metadatas)
-        total_chunks += len(chunks)
-        logger.debug(f"{pdf_file.name} processada.")
+    all_texts: List[str] = []
+    all_metadatas: List[Dict[str, Any]] = []
+    # "spawn" evita herdar por fork o canal gRPC já aberto pelo cliente Qdrant
+    with ProcessPoolExecutor(mp_context=get_context("spawn")) as pool:
+        # A conversão para markdown usa CPU, então roda em processos separados.
+        # Todas as conversões são submetidas de uma vez e seguem em segundo
+        # plano enquanto o LLM processa o lote anterior.
+        markdowns = pool.map(_convert_to_markdown, map(str, pdf_files))
+
+        for start in range(0, len(pdf_files), EXTRACT_BATCH_SIZE):
+            batch_files = pdf_files[start : start + EXTRACT_BATCH_SIZE]
+            pdf_names, prompts = [], []
+            for pdf_file, text_content in zip(batch_files, markdowns):
+                logger.debug(f"Processando {pdf_file.name}.")
+                pdf_names.append(pdf_file.name)
+                prompts.append(
+                    _build_extract_prompt(pdf_file.name, text_content)
+                )
+
+            # As chamadas ao LLM são limitadas por I/O, então são feitas em paralelo
+            responses = embedder.llm.batch(
+                prompts,
+                config={"max_concurrency": MAX_CONCURRENCY},
+                return_exceptions=True,
+            )
+
+            for pdf_name, response in zip(pdf_names, responses):
+                chunks = _parse_extract_response(response, pdf_name)
+                if not chunks:
+                    continue
+                all_texts.extend(c["text"] for c in chunks)
+                all_metadatas.extend(c["metadata"] for c in chunks)
+                total_chunks += len(chunks)
+                logger.debug(f"{pdf_name} processada.")
+
+            if len(all_texts) >= UPSERT_BATCH_SIZE:
+                _flush_chunks(vector_store, all_texts, all_metadatas)
+
+    _flush_chunks(vector_store, all_texts, all_metadatas)
 
     logger.success(
         f"✅ {len(pdf_files)} PDFs processados. {total_chunks} chunks inseridos no Qdrant."
@@ -0,0 +1,69 @@
+import re
+from typing import Tuple
+
+# Tipos de chunk pedidos explicitamente na pergunta. Sem menção, a busca fica
+# restrita ao conteúdo principal das súmulas.
+_CHUNK_TYPE_PATTERNS = (
+    ("precedentes", re.compile(r"\bprecedentes?\b", re.IGNORECASE)),
+    (
+        "referencias_normativas",
+        re.compile(r"\brefer[eê]ncias?\s+normativas?\b", re.IGNORECASE),
+    ),
+)
+_DEFAULT_CHUNK_TYPES = ("conteudo_principal",)
+
+# Datas completas ('DD/MM/AA' ou 'DD/MM/AAAA'), citações de normas
+# ('Lei 8.666/93', 'Lei 14.133/2021'), números de súmula (até três dígitos) e
+# anos citados na pergunta.
+_DATE_TOKEN_RE = re.compile(r"\b\d{1,2}/\d{1,2}/\d{2,4}\b")
+_LAW_NUMBER_RE = re.compile(
+    r"\b\d{1,3}(?:\.\d{3})*/\d{2,4}\b|\b\d{1,3}(?:\.\d{3})+\b"
+)
+_SUMULA_NUMBER_RE = re.compile(r"\b\d{1,3}\b")
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+
+def select_chunk_types(query: str) -> Tuple[str, ...]:
+    """
+    Identifica os tipos de chunk pedidos na pergunta, a partir de palavras-chave.
+
+    Args:
+        query (str): A pergunta do usuário.
+
+    Returns:
+        (Tuple[str, ...]): Os tipos de chunk a buscar; sem menção, apenas o conteúdo principal.
+    """
+    chunk_types = tuple(
+        chunk_type
+        for chunk_type, pattern in _CHUNK_TYPE_PATTERNS
+        if pattern.search(query)
+    )
+    return chunk_types or _DEFAULT_CHUNK_TYPES
+
+
+def classify_query(query: str) -> str:
+    """
+    Classifica a pergunta conforme os metadados que ela cita, para a escolha do query constructor.
+
+    Perguntas que citam só o número da súmula são "sumula"; só uma data ou ano, "data".
+    As demais, incluindo as que misturam os dois ou citam normas, são "completo".
+
+    Args:
+        query (str): A pergunta do usuário.
+
+    Returns:
+        (str): "sumula", "data" ou "completo".
+    """
+    # Os dígitos de uma data ('07/04/14') ou de uma norma ('8.666/93') não
+    # são números de súmula.
+    without_dates, n_dates = _DATE_TOKEN_RE.subn(" ", query)
+    without_laws, n_laws = _LAW_NUMBER_RE.subn(" ", without_dates)
+    has_year = n_dates > 0 or _YEAR_RE.search(without_laws) is not None
+    has_number = _SUMULA_NUMBER_RE.search(without_laws) is not None
+    if n_laws:
+        return "completo"
+    if has_number and not has_year:
+        return "sumula"
+    if has_year and not has_number:
+        return "data"
+    return "completo"
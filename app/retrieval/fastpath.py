@@ -0,0 +1,124 @@
+import re
+from typing import Any, List, Optional
+
+from langchain_core.structured_query import (
+    Comparator,
+    Comparison,
+    FilterDirective,
+    Operation,
+    Operator,
+    StructuredQuery,
+)
+
+# Padrões das perguntas mais comuns, traduzidas sem chamar o LLM. O status só
+# vira filtro no plural ("súmulas vigentes"): no singular ("a súmula 70 foi
+# revogada?") ele costuma ser a própria pergunta, não um critério de busca.
+_FASTPATH_SUMULA_RE = re.compile(
+    r"\bs[uú]mula\s+(?:n[º°o]?\.?\s*)?(\d{1,3})\b", re.IGNORECASE
+)
+_FASTPATH_STATUS_RE = re.compile(
+    r"\b(vigente|revogada|alterada)s\b", re.IGNORECASE
+)
+_FASTPATH_DATE_RE = re.compile(
+    r"\b(antes|depois|ap[oó]s|em)\s+(?:de\s+)?((?:19|20)\d{2})\b",
+    re.IGNORECASE,
+)
+_FASTPATH_DIGITS_RE = re.compile(r"\d+")
+_FASTPATH_OR_RE = re.compile(r"\bou\b", re.IGNORECASE)
+# Negações invertem o sentido do filtro ("súmulas não revogadas"): essas
+# perguntas ficam para o LLM.
+_FASTPATH_NEGATION_RE = re.compile(
+    r"\b(?:n[ãa]o|exceto|sem|nenhuma?)\b", re.IGNORECASE
+)
+
+
+def normalize_num_sumula(num_sumula: Any) -> Any:
+    """
+    Normaliza o número da súmula para o formato usado no payload, sem zeros à esquerda.
+
+    O mesmo formato é aplicado na ingestão e nos filtros do caminho rápido, de modo que
+    "070" (como nos nomes dos PDFs) e "70" casem no filtro de igualdade.
+
+    Args:
+        num_sumula (Any): O número extraído, como string ou inteiro.
+
+    Returns:
+        (Any): O número como string sem zeros à esquerda, ou o valor original se não for numérico.
+    """
+    text = str(num_sumula).strip() if num_sumula is not None else ""
+    if not text.isdigit():
+        return num_sumula
+    return str(int(text))
+
+
+def fastpath_structured_query(query: str) -> Optional[StructuredQuery]:
+    """
+    Traduz perguntas de formato conhecido diretamente em uma `StructuredQuery`, sem o LLM.
+
+    Reconhece o número da súmula ("súmula 70"), o status no plural ("vigentes", "revogadas", "alteradas")
+    e limites de data ("antes de 2010", "depois de 2015", "em 2014"), combinados com E.
+    Perguntas com "ou", com negações ("não", "exceto", "sem", "nenhuma"), com mais de um número
+    de súmula ou com números que não se encaixam em nenhum padrão são deixadas para o LLM.
+
+    Args:
+        query (str): A pergunta do usuário.
+
+    Returns:
+        (Optional[StructuredQuery]): A consulta estruturada, ou None se a pergunta não se encaixar nos padrões.
+    """
+    if _FASTPATH_OR_RE.search(query) or _FASTPATH_NEGATION_RE.search(query):
+        return None
+
+    sumulas = _FASTPATH_SUMULA_RE.findall(query)
+    dates = _FASTPATH_DATE_RE.findall(query)
+    if len(sumulas) > 1:
+        return None
+    # Todo número da pergunta precisa ter sido reconhecido por um padrão.
+    if len(_FASTPATH_DIGITS_RE.findall(query)) != len(sumulas) + len(dates):
+        return None
+
+    comparisons: List[FilterDirective] = []
+    if sumulas:
+        comparisons.append(
+            Comparison(
+                comparator=Comparator.EQ,
+                attribute="num_sumula",
+                value=normalize_num_sumula(sumulas[0]),
+            )
+        )
+    for status in dict.fromkeys(
+        s.upper() for s in _FASTPATH_STATUS_RE.findall(query)
+    ):
+        comparisons.append(
+            Comparison(
+                comparator=Comparator.EQ,
+                attribute="status_atual",
+                value=status,
+            )
+        )
+    for word, year in dates:
+        year = int(year)
+        word = word.lower()
+        if word == "antes":
+            bounds = [(Comparator.LT, year * 10000 + 101)]
+        elif word == "em":
+            bounds = [
+                (Comparator.GTE, year * 10000 + 101),
+                (Comparator.LTE, year * 10000 + 1231),
+            ]
+        else:
+            bounds = [(Comparator.GT, year * 10000 + 1231)]
+        comparisons.extend(
+            Comparison(
+                comparator=comparator, attribute="data_status_num", value=value
+            )
+            for comparator, value in bounds
+        )
+
+    if not comparisons:
+        return None
+    if len(comparisons) == 1:
+        filter = comparisons[0]
+    else:
+        filter = Operation(operator=Operator.AND, arguments=comparisons)
+    return StructuredQuery(query=query, filter=filter)
@@ -1,59 +1,651 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Optional
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
-from langchain.retrievers.self_query.base import SelfQueryRetriever
+from langchain.chains.query_constructor.base import (
+    load_query_constructor_runnable,
+)
+from langchain.retrievers.self_query.base import (
+    QUERY_CONSTRUCTOR_RUN_NAME,
+    SelfQueryRetriever,
+)
+from langchain_community.query_constructors.qdrant import QdrantTranslator
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
 from langchain_core.documents import Document
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.structured_query import StructuredQuery
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
+from langchain_qdrant.sparse_embeddings import SparseVector
+from pydantic import PrivateAttr
+from qdrant_client.http.models import (
+    FieldCondition,
+    Filter,
+    Fusion,
+    FusionQuery,
+    MatchAny,
+    MatchValue,
+    PayloadSelectorInclude,
+    Prefetch,
+    QuantizationSearchParams,
+    QueryRequest,
+    ScoredPoint,
+    SearchParams,
+)
+from qdrant_client.http.models import SparseVector as QdrantSparseVector
 
-from app.ingest.embed_qdrant import EmbeddingSelfQuery
+from app.ingest.embed_qdrant import get_embedder
+from app.retrieval.classifier import classify_query, select_chunk_types
+from app.retrieval.fastpath import fastpath_structured_query
 from app.retrieval.self_query import (
     document_content_description,
+    ensure_payload_indexes,
     metadata_field_info,
 )
+from app.utils.cache import LRUCache
+from app.utils.settings import settings
+
+# A quantização binária perde mais informação e precisa de mais candidatos
+# para o rescore do que a escalar.
+_DEFAULT_OVERSAMPLING = 3.0 if settings.QUANTIZATION == "binary" else 2.0
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SelfQueryConfig:
     """
     Configuração para o SelfQueryRetriever.
 
     Esta classe armazena as configurações usadas ao construir o retriever, como o nome da coleção no banco de dados Qdrant e o número de resultados desejados.
+    As instâncias são imutáveis e hasheáveis, pois são usadas como chave do cache de retrievers, e usam `__slots__` em vez de um `__dict__` por instância.
 
     Attributes:
         collection_name (str): Nome da coleção do Qdrant (padrão: "sumulas_jornada").
         k (int): Número de resultados a serem retornados na consulta (padrão: 10).
+        hnsw_ef (int): Tamanho da lista de candidatos explorada pelo HNSW na busca (padrão: 64).
+        oversampling (float): Fator de candidatos extras buscados nos vetores quantizados antes do rescore (padrão: 2.0; 3.0 com quantização binária).
+        use_quantization (bool): Se a busca deve usar os vetores quantizados da coleção (padrão: True, exceto com `QUANTIZATION=none`).
     """
 
     collection_name: str = "sumulas_jornada"
     k: int = 10
+    hnsw_ef: int = 64
+    oversampling: float = _DEFAULT_OVERSAMPLING
+    use_quantization: bool = settings.QUANTIZATION != "none"
+
+    def search_params(self) -> SearchParams:
+        """
+        Monta os parâmetros de busca ANN enviados ao Qdrant.
+
+        Com a quantização ativa, os candidatos são buscados nos vetores quantizados e reordenados
+        (rescore) com os vetores originais, preservando a qualidade do ranking.
+
+        Returns:
+            (SearchParams): Os parâmetros de HNSW e quantização da busca.
+        """
+        quantization = None
+        if self.use_quantization:
+            quantization = QuantizationSearchParams(
+                rescore=True, oversampling=self.oversampling
+            )
+        return SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+
+# Configuração padrão compartilhada: a classe é imutável, então uma única
+# instância serve a todas as chamadas sem `cfg`.
+_DEFAULT_CFG = SelfQueryConfig()
+
+
+@lru_cache(maxsize=None)
+def _chunk_type_filter(chunk_types: Tuple[str, ...]) -> Filter:
+    """
+    Monta o filtro do Qdrant que restringe a busca aos tipos de chunk informados.
 
+    O resultado fica em cache por combinação de tipos, já que as perguntas só geram poucas combinações.
 
-def build_self_query_retriever(cfg: SelfQueryConfig) -> SelfQueryRetriever:
+    Args:
+        chunk_types (Tuple[str, ...]): Os tipos de chunk aceitos na busca.
+
+    Returns:
+        (Filter): O filtro sobre `metadata.chunk_type`, com `MatchValue` para um tipo e `MatchAny` para vários.
+    """
+    if len(chunk_types) == 1:
+        match = MatchValue(value=chunk_types[0])
+    else:
+        match = MatchAny(any=list(chunk_types))
+    return Filter(
+        must=[FieldCondition(key="metadata.chunk_type", match=match)]
+    )
+
+
+def select_chunk_type_filter(query: str) -> Filter:
+    """
+    Monta o filtro de tipo de chunk aplicado a toda busca, a partir de palavras-chave da pergunta.
+
+    Por padrão, a busca considera apenas o conteúdo principal das súmulas. Perguntas que citam
+    "precedentes" ou "referências normativas" buscam nesses trechos. Os filtros são
+    pré-compilados e reaproveitados entre as perguntas.
+
+    Args:
+        query (str): A pergunta do usuário.
+
+    Returns:
+        (Filter): O filtro do Qdrant sobre `metadata.chunk_type`.
+    """
+    return _chunk_type_filter(select_chunk_types(query))
+
+
+class CachedSelfQueryRetriever(SelfQueryRetriever):
+    """
+    SelfQueryRetriever que mantém em cache as consultas estruturadas geradas pelo LLM.
+
+    A tradução da pergunta em consulta semântica e filtros é a etapa mais lenta da busca.
+    Perguntas repetidas reutilizam a `StructuredQuery` já gerada, sem uma nova chamada ao LLM.
+
+    Attributes:
+        cache_size (int): Número máximo de consultas estruturadas mantidas em cache (padrão: 1024).
+        query_constructor_selector (Optional[Callable[[str], Runnable]]): Função que escolhe o query constructor
+            de cada pergunta. Se None, usa sempre `query_constructor`.
+        base_filter_selector (Optional[Callable[[str], Filter]]): Função que monta o filtro base de cada pergunta,
+            combinado (E) com o filtro gerado pelo LLM. Se None, usa apenas o filtro do LLM.
+    """
+
+    cache_size: int = 1024
+    query_constructor_selector: Optional[Callable[[str], Runnable]] = None
+    base_filter_selector: Optional[Callable[[str], Filter]] = None
+
+    _structured_queries: LRUCache = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        """
+        Cria o cache LRU das consultas estruturadas com o tamanho configurado em `cache_size`.
+
+        Args:
+            __context (Any): Contexto de validação repassado pelo pydantic.
+        """
+        super().model_post_init(__context)
+        self._structured_queries = LRUCache(self.cache_size)
+
+    def _query_constructor_for(self, query: str) -> Runnable:
+        """
+        Escolhe o query constructor da pergunta com `query_constructor_selector`, se houver.
+
+        Args:
+            query (str): A pergunta do usuário.
+
+        Returns:
+            (Runnable): O query constructor usado para gerar a consulta estruturada.
+        """
+        if self.query_constructor_selector is None:
+            return self.query_constructor
+        return self.query_constructor_selector(query)
+
+    def construct_query(
+        self, query: str, config: Optional[RunnableConfig] = None
+    ) -> StructuredQuery:
+        """
+        Gera a consulta estruturada da pergunta.
+
+        Perguntas de formato conhecido são traduzidas por
+        `app.retrieval.fastpath.fastpath_structured_query`; as demais usam o cache ou,
+        na falta dele, o LLM.
+
+        Args:
+            query (str): A pergunta do usuário.
+            config (Optional[RunnableConfig]): Configuração repassada ao query constructor quando o LLM é chamado.
+
+        Returns:
+            (StructuredQuery): A consulta semântica e os filtros inferidos para a pergunta.
+        """
+        structured_query = fastpath_structured_query(query)
+        if structured_query is not None:
+            return structured_query
+        return self._structured_queries.get_or_compute(
+            query,
+            lambda q: self._query_constructor_for(q).invoke(
+                {"query": q}, config=config
+            ),
+        )
+
+    async def aconstruct_query(
+        self, query: str, config: Optional[RunnableConfig] = None
+    ) -> StructuredQuery:
+        """
+        Versão assíncrona de `construct_query`.
+
+        Args:
+            query (str): A pergunta do usuário.
+            config (Optional[RunnableConfig]): Configuração repassada ao query constructor quando o LLM é chamado.
+
+        Returns:
+            (StructuredQuery): A consulta semântica e os filtros inferidos para a pergunta.
+        """
+        structured_query = fastpath_structured_query(query)
+        if structured_query is not None:
+            return structured_query
+        return await self._structured_queries.aget_or_compute(
+            query,
+            lambda q: self._query_constructor_for(q).ainvoke(
+                {"query": q}, config=config
+            ),
+        )
+
+    def _prepare_query(
+        self, query: str, structured_query: StructuredQuery
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Converte a consulta estruturada nos argumentos da busca, acrescentando o filtro base da pergunta.
+
+        Args:
+            query (str): A pergunta do usuário.
+            structured_query (StructuredQuery): A consulta semântica e os filtros inferidos para a pergunta.
+
+        Returns:
+            (Tuple[str, Dict[str, Any]]): O texto da consulta semântica e os argumentos da busca, com o
+                filtro base combinado (E) com o filtro gerado pelo LLM.
+        """
+        new_query, search_kwargs = super()._prepare_query(
+            query, structured_query
+        )
+        if self.base_filter_selector is not None:
+            base_filter = self.base_filter_selector(query)
+            llm_filter = search_kwargs.get("filter")
+            search_kwargs["filter"] = (
+                Filter(must=[base_filter, llm_filter])
+                if llm_filter is not None
+                else base_filter
+            )
+        return new_query, search_kwargs
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        """
+        Busca os documentos da pergunta usando a consulta estruturada em cache, quando houver.
+
+        Args:
+            query (str): A pergunta do usuário.
+            run_manager (CallbackManagerForRetrieverRun): Gerenciador de callbacks da execução do retriever.
+
+        Returns:
+            (List[Document]): Os documentos encontrados.
+        """
+        structured_query = self.construct_query(
+            query, config={"callbacks": run_manager.get_child()}
+        )
+        new_query, search_kwargs = self._prepare_query(query, structured_query)
+        return self._get_docs_with_query(new_query, search_kwargs)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        """
+        Versão assíncrona de `_get_relevant_documents`.
+
+        Args:
+            query (str): A pergunta do usuário.
+            run_manager (AsyncCallbackManagerForRetrieverRun): Gerenciador de callbacks da execução do retriever.
+
+        Returns:
+            (List[Document]): Os documentos encontrados.
+        """
+        structured_query = await self.aconstruct_query(
+            query, config={"callbacks": run_manager.get_child()}
+        )
+        new_query, search_kwargs = self._prepare_query(query, structured_query)
+        return await self._aget_docs_with_query(new_query, search_kwargs)
+
+
+# Na busca híbrida, cada ramo (denso e BM25) traz `k * HYBRID_PREFETCH_FACTOR`
+# candidatos para a fusão RRF.
+HYBRID_PREFETCH_FACTOR = 4
+
+# Número máximo de buscas enviadas ao Qdrant em uma única chamada em lote.
+SEARCH_BATCH_SIZE = 16
+
+# Coleções cujos índices de payload já foram verificados neste processo.
+_INDEXED_COLLECTIONS: Set[str] = set()
+
+# Projeção do payload devolvido pelo Qdrant: apenas o conteúdo e os metadados
+# exibidos nas respostas. Campos usados só nos filtros (ex.: data_status_num,
+# chunk_index) não trafegam de volta.
+PAYLOAD_SELECTOR = PayloadSelectorInclude(
+    include=[
+        "page_content",
+        "metadata.num_sumula",
+        "metadata.status_atual",
+        "metadata.data_status",
+        "metadata.data_status_ano",
+        "metadata.pdf_name",
+        "metadata.chunk_type",
+    ]
+)
+
+# Tradutor das consultas estruturadas para filtros do Qdrant. O
+# QdrantVectorStore guarda os metadados sob a chave "metadata" do payload.
+TRANSLATOR = QdrantTranslator(metadata_key="metadata")
+
+# Subconjuntos de `metadata_field_info` usados pelos query constructors
+# especializados. `None` oferece todos os campos ao LLM.
+_QUERY_CONSTRUCTOR_FIELDS = {
+    "sumula": ("num_sumula", "status_atual"),
+    "data": ("data_status_num", "status_atual"),
+    "completo": None,
+}
+
+
+def _build_query_constructor(fields: Optional[Tuple[str, ...]]) -> Runnable:
+    """
+    Monta um query constructor cujo prompt descreve apenas os campos informados.
+
+    Args:
+        fields (Optional[Tuple[str, ...]]): Nomes dos campos de `metadata_field_info` incluídos no prompt. Se None, inclui todos.
+
+    Returns:
+        (Runnable): O query constructor que traduz a pergunta em uma `StructuredQuery`.
+    """
+    attributes = [
+        attribute
+        for attribute in metadata_field_info
+        if fields is None or attribute.name in fields
+    ]
+    return load_query_constructor_runnable(
+        get_embedder().llm,
+        document_content_description,
+        attributes,
+        allowed_comparators=TRANSLATOR.allowed_comparators,
+        allowed_operators=TRANSLATOR.allowed_operators,
+        enable_limit=True,
+    ).with_config(run_name=QUERY_CONSTRUCTOR_RUN_NAME)
+
+
+# Query constructors compartilhados: os prompts com a descrição dos documentos
+# e dos metadados são montados uma única vez, na importação do módulo, em vez
+# de a cada construção de retriever.
+QUERY_CONSTRUCTORS: Dict[str, Runnable] = {
+    name: _build_query_constructor(fields)
+    for name, fields in _QUERY_CONSTRUCTOR_FIELDS.items()
+}
+QUERY_CONSTRUCTOR = QUERY_CONSTRUCTORS["completo"]
+
+
+def select_query_constructor(query: str) -> Runnable:
+    """
+    Escolhe o query constructor mais enxuto capaz de atender à pergunta.
+
+    Perguntas que citam só o número da súmula, ou só uma data ou ano, usam um prompt com poucos campos,
+    reduzindo os tokens enviados ao LLM. Nos demais casos, usa o prompt completo.
+
+    Args:
+        query (str): A pergunta do usuário.
+
+    Returns:
+        (Runnable): O query constructor selecionado.
+    """
+    return QUERY_CONSTRUCTORS[classify_query(query)]
+
+
+@lru_cache(maxsize=16)
+def build_self_query_retriever(
+    cfg: SelfQueryConfig,
+) -> CachedSelfQueryRetriever:
     """
     Cria o SelfQueryRetriever sobre o QdrantVectorStore.
 
-    Esta função configura e retorna um `SelfQueryRetriever` utilizando a configuração fornecida.
-    O retriever é configurado para realizar buscas usando a coleção do Qdrant e o modelo de LLM fornecido pelo embedder.
+    Esta função configura e retorna um `CachedSelfQueryRetriever` utilizando a configuração fornecida.
+    O retriever é configurado para realizar buscas usando a coleção do Qdrant e os query constructors compartilhados, escolhidos por pergunta em `select_query_constructor`.
+    O resultado é mantido em cache por configuração, então chamadas seguintes com a mesma `cfg` reutilizam o retriever já construído.
 
     Args:
         cfg (SelfQueryConfig): Configuração contendo o nome da coleção e o número de resultados.
 
     Returns:
-        retriever (SelfQueryRetriever): Um objeto configurado para realizar consultas no banco de dados Qdrant com base na configuração fornecida.
+        retriever (CachedSelfQueryRetriever): Um objeto configurado para realizar consultas no banco de dados Qdrant com base na configuração fornecida.
     """
-    embedder = EmbeddingSelfQuery()
+    embedder = get_embedder()
     vectorstore = embedder.get_qdrant_vector_store(cfg.collection_name)
 
-    retriever = SelfQueryRetriever.from_llm(
-        llm=embedder.llm,
+    # Os filtros gerados pelo self-query só ficam baratos com os campos
+    # indexados; a verificação é feita uma vez por coleção.
+    if cfg.collection_name not in _INDEXED_COLLECTIONS:
+        ensure_payload_indexes(embedder.client, cfg.collection_name)
+        _INDEXED_COLLECTIONS.add(cfg.collection_name)
+
+    retriever = CachedSelfQueryRetriever(
+        query_constructor=QUERY_CONSTRUCTOR,
+        query_constructor_selector=select_query_constructor,
+        base_filter_selector=select_chunk_type_filter,
         vectorstore=vectorstore,
-        document_contents=document_content_description,
-        metadata_field_info=metadata_field_info,
-        enable_limit=True,
-        search_kwargs={"k": cfg.k},
+        structured_query_translator=TRANSLATOR,
+        search_kwargs={
+            "k": cfg.k,
+            "search_params": cfg.search_params(),
+            "with_payload": PAYLOAD_SELECTOR,
+        },
     )
     return retriever
 
 
+def embed_query(
+    vectorstore: QdrantVectorStore, query: str
+) -> Tuple[List[float], Optional[SparseVector]]:
+    """
+    Calcula os embeddings da consulta usados pela busca no vector store.
+
+    Args:
+        vectorstore (QdrantVectorStore): O vector store onde a busca será feita.
+        query (str): O texto da consulta.
+
+    Returns:
+        (Tuple[List[float], Optional[SparseVector]]): O embedding denso e, no modo híbrido, o embedding esparso (BM25) da consulta.
+    """
+    query_vector = vectorstore.embeddings.embed_query(query)
+    if vectorstore.retrieval_mode != RetrievalMode.HYBRID:
+        return query_vector, None
+    return query_vector, vectorstore.sparse_embeddings.embed_query(query)
+
+
+def _hybrid_prefetch(
+    vectorstore: QdrantVectorStore,
+    query_vector: List[float],
+    sparse_vector: SparseVector,
+    k: int,
+    filter: Optional[Filter],
+    search_params: Optional[SearchParams],
+) -> List[Prefetch]:
+    """
+    Monta as duas buscas (densa e esparsa) cujos resultados o Qdrant combina por RRF.
+
+    Args:
+        vectorstore (QdrantVectorStore): O vector store com os nomes dos vetores denso e esparso.
+        query_vector (List[float]): O embedding denso da consulta.
+        sparse_vector (SparseVector): O embedding esparso (BM25) da consulta.
+        k (int): Número de resultados da busca final.
+        filter (Optional[Filter]): Filtro de metadados do Qdrant aplicado aos dois ramos.
+        search_params (Optional[SearchParams]): Parâmetros do HNSW e da quantização, aplicados só ao ramo denso.
+
+    Returns:
+        (List[Prefetch]): As buscas densa e esparsa, cada uma com `k * HYBRID_PREFETCH_FACTOR` candidatos.
+    """
+    # Cada busca (densa e esparsa) traz mais candidatos do que o resultado
+    # final, para que a fusão RRF tenha o que reordenar.
+    limit = k * HYBRID_PREFETCH_FACTOR
+    return [
+        Prefetch(
+            query=query_vector,
+            using=vectorstore.vector_name,
+            filter=filter,
+            params=search_params,
+            limit=limit,
+        ),
+        Prefetch(
+            query=QdrantSparseVector(
+                indices=sparse_vector.indices, values=sparse_vector.values
+            ),
+            using=vectorstore.sparse_vector_name,
+            filter=filter,
+            limit=limit,
+        ),
+    ]
+
+
+def search_by_vector(
+    vectorstore: QdrantVectorStore,
+    query_vector: List[float],
+    k: int = 4,
+    filter: Optional[Filter] = None,
+    sparse_vector: Optional[SparseVector] = None,
+    prefetch_k: Optional[int] = None,
+    **kwargs: Any,
+) -> List[Document]:
+    """
+    Busca os documentos mais próximos de um vetor de consulta já calculado.
+
+    Permite calcular o embedding da consulta uma única vez e reaproveitá-lo em mais de uma busca.
+    Diferente de `QdrantVectorStore.similarity_search_by_vector`, não valida a configuração da coleção
+    a cada chamada, evitando uma requisição extra ao Qdrant.
+    Quando o vetor esparso é informado, a busca é híbrida: os resultados densos e BM25 são
+    combinados no próprio Qdrant por Reciprocal Rank Fusion (RRF).
+
+    Args:
+        vectorstore (QdrantVectorStore): O vector store onde a busca será feita.
+        query_vector (List[float]): O embedding denso da consulta.
+        k (int, opcional): Número de resultados a serem retornados. Padrão é 4.
+        filter (Optional[Filter]): Filtro de metadados do Qdrant aplicado à busca.
+        sparse_vector (Optional[SparseVector]): O embedding esparso (BM25) da consulta, usado na busca híbrida.
+        prefetch_k (Optional[int]): Tamanho da lista fundida da qual a página é lida, na busca híbrida.
+            Buscas paginadas da mesma consulta devem usar o mesmo valor para ordenar a mesma lista.
+            Se None, usa `k` mais o `offset`.
+        **kwargs: Parâmetros adicionais repassados para `QdrantClient.query_points` (ex.: `search_params`).
+
+    Returns:
+        (List[Document]): Lista de documentos mais próximos do vetor de consulta.
+    """
+    kwargs = {"with_payload": True, **kwargs}
+    if sparse_vector is None:
+        points = vectorstore.client.query_points(
+            collection_name=vectorstore.collection_name,
+            query=query_vector,
+            using=vectorstore.vector_name,
+            query_filter=filter,
+            limit=k,
+            **kwargs,
+        ).points
+    else:
+        # Os escores RRF dependem dos candidatos de cada ramo: com `offset`,
+        # a fusão precisa cobrir também as páginas puladas.
+        if prefetch_k is None:
+            prefetch_k = k + (kwargs.get("offset") or 0)
+        prefetch = _hybrid_prefetch(
+            vectorstore,
+            query_vector,
+            sparse_vector,
+            prefetch_k,
+            filter,
+            kwargs.pop("search_params", None),
+        )
+        points = vectorstore.client.query_points(
+            collection_name=vectorstore.collection_name,
+            prefetch=prefetch,
+            query=FusionQuery(fusion=Fusion.RRF),
+            limit=k,
+            **kwargs,
+        ).points
+    return _points_to_documents(vectorstore, points)
+
+
+def _points_to_documents(
+    vectorstore: QdrantVectorStore, points: List[ScoredPoint]
+) -> List[Document]:
+    """
+    Converte os pontos retornados pelo Qdrant em documentos do LangChain.
+
+    Args:
+        vectorstore (QdrantVectorStore): O vector store com as chaves de conteúdo e metadados do payload.
+        points (List[ScoredPoint]): Os pontos retornados pela busca.
+
+    Returns:
+        (List[Document]): Os documentos, na mesma ordem dos pontos.
+    """
+    return [
+        vectorstore._document_from_point(
+            point,
+            vectorstore.collection_name,
+            vectorstore.content_payload_key,
+            vectorstore.metadata_payload_key,
+        )
+        for point in points
+    ]
+
+
+def _prepare_search(
+    retriever: CachedSelfQueryRetriever,
+    query: str,
+    structured_query: StructuredQuery,
+) -> Tuple[List[float], Optional[SparseVector], Dict[str, Any]]:
+    """
+    Converte a consulta estruturada nos embeddings e nos argumentos de `search_by_vector`.
+
+    Args:
+        retriever (CachedSelfQueryRetriever): O retriever que gerou a consulta estruturada.
+        query (str): A pergunta do usuário, usada na escolha do filtro base.
+        structured_query (StructuredQuery): A consulta semântica e os filtros inferidos para a pergunta.
+
+    Returns:
+        (Tuple[List[float], Optional[SparseVector], Dict[str, Any]]): Os embeddings denso e esparso da
+            consulta e os argumentos da busca (k, filtro, parâmetros e projeção do payload).
+    """
+    new_query, search_kwargs = retriever._prepare_query(
+        query, structured_query
+    )
+    query_vector, sparse_vector = embed_query(retriever.vectorstore, new_query)
+    return query_vector, sparse_vector, search_kwargs
+
+
+def search_structured(
+    retriever: CachedSelfQueryRetriever,
+    query: str,
+    structured_query: StructuredQuery,
+) -> List[Document]:
+    """
+    Executa a busca de uma consulta estruturada já gerada pelo retriever.
+
+    É o caminho usado por `search`, `asearch` e pelos nós de recuperação do grafo. Na busca
+    híbrida, `search_by_vector` traz `k * HYBRID_PREFETCH_FACTOR` candidatos por ramo antes da
+    fusão e aplica os `search_params` densos só ao ramo denso, ao contrário do `retriever.invoke`
+    do langchain-qdrant.
+
+    Args:
+        retriever (CachedSelfQueryRetriever): O retriever que gerou a consulta estruturada.
+        query (str): A pergunta do usuário, usada na escolha do filtro base.
+        structured_query (StructuredQuery): A consulta semântica e os filtros inferidos para a pergunta.
+
+    Returns:
+        (List[Document]): Os documentos encontrados.
+    """
+    query_vector, sparse_vector, search_kwargs = _prepare_search(
+        retriever, query, structured_query
+    )
+    return search_by_vector(
+        retriever.vectorstore,
+        query_vector,
+        sparse_vector=sparse_vector,
+        **search_kwargs,
+    )
+
+
 def search(
     query: str,
     cfg: Optional[SelfQueryConfig] = None,
@@ -71,7 +663,175 @@ def search(
     Returns:
         (List[Document]): Lista de documentos (`Document`) que correspondem à consulta, incluindo metadados e conteúdo relevante.
     """
-    cfg = cfg or SelfQueryConfig()
+    cfg = cfg if cfg is not None else _DEFAULT_CFG
+    retriever = build_self_query_retriever(cfg)
+    structured_query = retriever.construct_query(query)
+    return search_structured(retriever, query, structured_query)
+
+
+def search_iter(
+    query: str,
+    cfg: Optional[SelfQueryConfig] = None,
+    first_batch: int = 2,
+) -> Iterator[Document]:
+    """
+    Versão de `search` que entrega os documentos à medida que ficam disponíveis.
+
+    A consulta estruturada e os embeddings são calculados uma única vez. A busca é feita em duas etapas:
+    os `first_batch` documentos mais relevantes são buscados e entregues primeiro, e o restante (até `cfg.k`)
+    é buscado em seguida com `offset`, permitindo que quem consome comece a trabalhar mais cedo.
+
+    Args:
+        query (str): A consulta textual a ser realizada.
+        cfg (Optional[SelfQueryConfig]): A configuração personalizada para o retriever. Se não fornecido, usa a configuração padrão.
+        first_batch (int, opcional): Número de documentos buscados na primeira etapa. Padrão é 2.
+
+    Returns:
+        (Iterator[Document]): Os documentos que correspondem à consulta, do mais ao menos relevante.
+    """
+    cfg = cfg if cfg is not None else _DEFAULT_CFG
+    retriever = build_self_query_retriever(cfg)
+    vectorstore = retriever.vectorstore
+
+    structured_query = retriever.construct_query(query)
+    query_vector, sparse_vector, search_kwargs = _prepare_search(
+        retriever, query, structured_query
+    )
+
+    k = search_kwargs.pop("k", cfg.k)
+    first_batch = min(first_batch, k)
+    # As duas etapas leem páginas da mesma lista fundida de `k` resultados.
+    yield from search_by_vector(
+        vectorstore,
+        query_vector,
+        k=first_batch,
+        sparse_vector=sparse_vector,
+        prefetch_k=k,
+        **search_kwargs,
+    )
+    if k > first_batch:
+        yield from search_by_vector(
+            vectorstore,
+            query_vector,
+            k=k - first_batch,
+            sparse_vector=sparse_vector,
+            prefetch_k=k,
+            offset=first_batch,
+            **search_kwargs,
+        )
+
+
+async def asearch(
+    query: str,
+    cfg: Optional[SelfQueryConfig] = None,
+) -> List[Document]:
+    """
+    Versão assíncrona de `search`, que não bloqueia o event loop durante as chamadas ao LLM e ao Qdrant.
+
+    Args:
+        query (str): A consulta textual a ser realizada.
+        cfg (Optional[SelfQueryConfig]): A configuração personalizada para o retriever. Se não fornecido, usa a configuração padrão.
+
+    Returns:
+        (List[Document]): Lista de documentos (`Document`) que correspondem à consulta, incluindo metadados e conteúdo relevante.
+    """
+    cfg = cfg if cfg is not None else _DEFAULT_CFG
+    retriever = build_self_query_retriever(cfg)
+    structured_query = await retriever.aconstruct_query(query)
+    return await asyncio.to_thread(
+        search_structured, retriever, query, structured_query
+    )
+
+
+async def parallel_search(
+    queries: List[str],
+    cfg: Optional[SelfQueryConfig] = None,
+) -> List[List[Document]]:
+    """
+    Executa várias consultas de forma concorrente.
+
+    O tempo total passa a ser próximo ao da consulta mais lenta, em vez da soma de todas elas.
+
+    Args:
+        queries (List[str]): As consultas textuais a serem realizadas.
+        cfg (Optional[SelfQueryConfig]): A configuração personalizada para o retriever. Se não fornecido, usa a configuração padrão.
+
+    Returns:
+        (List[List[Document]]): Os documentos encontrados para cada consulta, na mesma ordem de `queries`.
+    """
+    return list(await asyncio.gather(*(asearch(q, cfg) for q in queries)))
+
+
+def search_many(
+    queries: List[str],
+    cfg: Optional[SelfQueryConfig] = None,
+) -> List[List[Document]]:
+    """
+    Executa várias consultas com self-query agrupando as buscas no Qdrant.
+
+    As perguntas são traduzidas pelo LLM em paralelo e as buscas resultantes são enviadas
+    em lotes de até `SEARCH_BATCH_SIZE` por `query_batch_points`, pagando uma única ida e volta
+    ao Qdrant por lote em vez de uma por consulta.
+
+    Args:
+        queries (List[str]): As consultas textuais a serem realizadas.
+        cfg (Optional[SelfQueryConfig]): A configuração personalizada para o retriever. Se não fornecido, usa a configuração padrão.
+
+    Returns:
+        (List[List[Document]]): Os documentos encontrados para cada consulta, na mesma ordem de `queries`.
+    """
+    if not queries:
+        return []
+
+    cfg = cfg if cfg is not None else _DEFAULT_CFG
     retriever = build_self_query_retriever(cfg)
-    # .invoke() retorna List[Document]
-    return retriever.invoke(query)
+    vectorstore = retriever.vectorstore
+
+    with ThreadPoolExecutor(max_workers=min(len(queries), 8)) as pool:
+        structured_queries = list(pool.map(retriever.construct_query, queries))
+
+    requests = []
+    for query, structured_query in zip(queries, structured_queries):
+        query_vector, sparse_vector, search_kwargs = _prepare_search(
+            retriever, query, structured_query
+        )
+        k = search_kwargs.get("k", cfg.k)
+        query_filter = search_kwargs.get("filter")
+        search_params = search_kwargs.get("search_params")
+        with_payload = search_kwargs.get("with_payload", True)
+        if sparse_vector is None:
+            request = QueryRequest(
+                query=query_vector,
+                using=vectorstore.vector_name,
+                filter=query_filter,
+                params=search_params,
+                limit=k,
+                with_payload=with_payload,
+            )
+        else:
+            request = QueryRequest(
+                prefetch=_hybrid_prefetch(
+                    vectorstore,
+                    query_vector,
+                    sparse_vector,
+                    k,
+                    query_filter,
+                    search_params,
+                ),
+                query=FusionQuery(fusion=Fusion.RRF),
+                limit=k,
+                with_payload=with_payload,
+            )
+        requests.append(request)
+
+    results = []
+    for start in range(0, len(requests), SEARCH_BATCH_SIZE):
+        responses = vectorstore.client.query_batch_points(
+            collection_name=vectorstore.collection_name,
+            requests=requests[start : start + SEARCH_BATCH_SIZE],
+        )
+        results.extend(
+            _points_to_documents(vectorstore, response.points)
+            for response in responses
+        )
+    return results
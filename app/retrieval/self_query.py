@@ -1,4 +1,7 @@
 from langchain.chains.query_constructor.schema import AttributeInfo
+from loguru import logger
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PayloadSchemaType
 
 """
 Lista de informações de atributos (metadados) que descrevem cada campo nas súmulas do Tribunal de Contas de Minas Gerais.
@@ -9,21 +12,26 @@ A lista contém as seguintes informações:
 
 1. **num_sumula**: Número da súmula, representado como uma string.
 2. **status_atual**: O status atual da súmula (ex: 'VIGENTE', 'REVOGADA', 'ALTERADA'), representado como uma string.
-3. **data_status**: Data de status da súmula no formato 'DD/MM/AA', representada como uma string.
-4. **data_status_ano**: Ano de publicação da súmula, representado como um número inteiro.
-5. **pdf_name**: Nome do arquivo PDF de origem, representado como uma string.
-6. **chunk_type**: Tipo do chunk do documento (ex: 'conteudo_principal', 'referencias_normativas', 'precedentes'), representado como uma string.
-7. **chunk_index**: Índice do chunk dentro do documento, representado como um número inteiro.
+3. **data_status_num**: Data de status da súmula no formato AAAAMMDD, representada como um número inteiro.
+4. **pdf_name**: Nome do arquivo PDF de origem, representado como uma string.
+5. **chunk_index**: Índice do chunk dentro do documento, representado como um número inteiro.
+
+Os campos textuais `data_status` ('DD/MM/AA') e `data_status_ano` continuam no payload para exibição,
+mas não são oferecidos ao LLM: todas as comparações de datas usam o inteiro `data_status_num`.
+O tipo do chunk (`chunk_type`) também não é oferecido ao LLM: o filtro por tipo é aplicado pelo retriever
+(ver `select_chunk_type_filter` em `app.retrieval.retriever`).
 
 Cada `AttributeInfo` é um objeto com a seguinte estrutura:
     - **name** (str): Nome do campo de metadado.
     - **description** (str): Descrição detalhada sobre o campo e como ele deve ser utilizado.
     - **type** (str): Tipo de dado esperado para o campo (ex.: "string", "integer").
 
-Tipo de `metadata_field_info`: `List[AttributeInfo]`
+Tipo de `metadata_field_info`: `Tuple[AttributeInfo, ...]`
+
+A coleção é uma tupla imutável, montada uma única vez na importação do módulo e compartilhada por todos os retrievers.
 """
 
-metadata_field_info = [
+metadata_field_info = (
     AttributeInfo(
         name="num_sumula",
         description=(
@@ -38,20 +46,10 @@ metadata_field_info = [
         type="string",
     ),
     AttributeInfo(
-        name="data_status",
-        description=(
-            "Data textual no formato 'DD/MM/AA' (string). Ex.: '07/04/14'.\n"
-        ),
-        type="string",
-    ),
-    AttributeInfo(
-        name="data_status_ano",
+        name="data_status_num",
         description=(
-            "Ano da publicação no formato 'AAAA' (integer). Ex.: '2014'.\n"
-            "- Você PODE usar operadores de comparação (lt, gt, lte, gte) e igualdade (eq).\n"
-            "- Para anos (ex.: 'antes de 2010'), interprete como comparações sobre datas, mesmo que o campo seja string.\n"
-            "- Se o usuário disser 'antes de AAAA', use 'lt' e considere o começo do ano AAAA como limite.\n"
-            "- Se o usuário disser 'depois de AAAA', use 'gt' e considere o fim do ano AAAA como limite.\n"
+            "Data de status no formato AAAAMMDD (integer). Ex.: 20140407 para 07/04/2014.\n"
+            "- Use lt/gt/lte/gte com datas nesse formato. Ex.: 'antes de 2010' -> lt 20100101."
         ),
         type="integer",
     ),
@@ -60,19 +58,48 @@ metadata_field_info = [
         description="Nome do arquivo PDF de origem (ex.: 'Sumula_70.pdf').",
         type="string",
     ),
-    AttributeInfo(
-        name="chunk_type",
-        description="Tipo do chunk: 'conteudo_principal', 'referencias_normativas' ou 'precedentes'.",
-        type="string",
-    ),
     AttributeInfo(
         name="chunk_index",
         description="Índice do chunk no documento.",
         type="integer",
     ),
-]
+)
 document_content_description = """
     Coleção de trechos (chunks) de súmulas do Tribunal de Contas de Minas Gerais, 
     cada uma com metadados como número (num_sumula), status (status_atual), 
-    data textual (data_status, formato 'DD/MM/AA'), nome do arquivo (pdf_name) e tipo de trecho (chunk_type).\n\n
+    data de status (data_status_num, inteiro AAAAMMDD) e nome do arquivo (pdf_name).\n\n
 """
+
+# Campos filtrados fora do self-query, que também precisam de índice de payload.
+RETRIEVER_FILTER_FIELDS = (("chunk_type", "string"),)
+
+
+def ensure_payload_indexes(client: QdrantClient, collection: str) -> None:
+    """
+    Cria os índices de payload de cada campo de `metadata_field_info` e de `RETRIEVER_FILTER_FIELDS`, caso ainda não existam.
+
+    Sem índices, o Qdrant precisa ler o payload de cada candidato para aplicar os filtros de metadados do self-query.
+    Campos `string` recebem índice `keyword` e campos `integer` recebem índice `integer`.
+    O LangChain salva os metadados dentro da chave "metadata" do payload, por isso os campos são prefixados.
+
+    Args:
+        client (QdrantClient): O cliente Qdrant usado para consultar e criar os índices.
+        collection (str): O nome da coleção onde os índices serão criados.
+    """
+    existing = client.get_collection(collection).payload_schema
+    fields = [(a.name, a.type) for a in metadata_field_info]
+    fields.extend(RETRIEVER_FILTER_FIELDS)
+    for name, field_type in fields:
+        field_name = f"metadata.{name}"
+        if field_name in existing:
+            continue
+        client.create_payload_index(
+            collection_name=collection,
+            field_name=field_name,
+            field_schema=(
+                PayloadSchemaType.INTEGER
+                if field_type == "integer"
+                else PayloadSchemaType.KEYWORD
+            ),
+        )
+        logger.info(f"Índice de payload '{field_name}' criado.")
@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+# Marca a ausência de uma chave, já que `None` pode ser um valor em cache.
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Cache LRU, seguro entre threads, dos valores calculados por chave.
+
+    O cálculo do valor é feito fora do lock, então chamadas concorrentes para chaves diferentes
+    não esperam umas pelas outras. Quando o limite é atingido, a chave usada há mais tempo é descartada.
+
+    Args:
+        maxsize (int): Número máximo de chaves mantidas em cache.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: Hashable) -> Any:
+        """
+        Lê a chave do cache, marcando-a como a usada mais recentemente.
+
+        Args:
+            key (Hashable): A chave procurada.
+
+        Returns:
+            (Any): O valor em cache, ou `_MISSING` se a chave não estiver no cache.
+        """
+        with self._lock:
+            value = self._items.get(key, _MISSING)
+            if value is not _MISSING:
+                self._items.move_to_end(key)
+            return value
+
+    def _set(self, key: Hashable, value: Any) -> None:
+        """
+        Grava o valor da chave, descartando a chave mais antiga se o limite for ultrapassado.
+
+        Args:
+            key (Hashable): A chave gravada.
+            value (Any): O valor associado à chave.
+        """
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def get_or_compute(
+        self, key: Hashable, compute: Callable[[Hashable], Any]
+    ) -> Any:
+        """
+        Retorna o valor em cache da chave ou o calcula e o grava no cache.
+
+        Args:
+            key (Hashable): A chave procurada.
+            compute (Callable[[Hashable], Any]): Função que calcula o valor a partir da chave.
+
+        Returns:
+            (Any): O valor associado à chave.
+        """
+        value = self._get(key)
+        if value is _MISSING:
+            value = compute(key)
+            self._set(key, value)
+        return value
+
+    async def aget_or_compute(
+        self, key: Hashable, compute: Callable[[Hashable], Awaitable[Any]]
+    ) -> Any:
+        """
+        Versão assíncrona de `get_or_compute`, para funções de cálculo assíncronas.
+
+        Args:
+            key (Hashable): A chave procurada.
+            compute (Callable[[Hashable], Awaitable[Any]]): Função assíncrona que calcula o valor a partir da chave.
+
+        Returns:
+            (Any): O valor associado à chave.
+        """
+        value = self._get(key)
+        if value is _MISSING:
+            value = await compute(key)
+            self._set(key, value)
+        return value
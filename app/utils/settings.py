@@ -1,28 +1,71 @@
 import os
 from platform import system
+from typing import Optional
 
 from dotenv import find_dotenv, load_dotenv
 
+_env_file: Optional[str] = None
+
+
+def _init_env() -> str:
+    """
+    Localiza e carrega o arquivo `.env` uma única vez por processo.
+
+    `find_dotenv` percorre os diretórios ancestrais procurando o arquivo, então o caminho
+    encontrado é memorizado e reaproveitado nas chamadas seguintes.
+
+    Returns:
+        (str): O caminho do arquivo `.env` encontrado, ou uma string vazia se não houver.
+    """
+    global _env_file
+    if _env_file is None:
+        _env_file = find_dotenv()
+        load_dotenv(_env_file)
+    return _env_file
+
 
 class Settings:
     """
     Classe responsável por carregar as configurações do sistema, variáveis de ambiente e definir parâmetros específicos
     para a aplicação, como as configurações do Qdrant, modelo e chaves da API.
 
-    A classe carrega automaticamente o arquivo `.env` e disponibiliza os valores como atributos de classe.
+    A classe carrega o arquivo `.env` na criação da instância e disponibiliza os valores como atributos,
+    já convertidos para o tipo usado pela aplicação.
     """
 
-    load_dotenv()
-
-    ENV_FILE = find_dotenv()
-    SYSTEM = system()
+    def __init__(self) -> None:
+        self.ENV_FILE = _init_env()
+        self.SYSTEM = system()
 
-    QDRANT_HOST = os.getenv("QDRANT_HOST")
-    QDRANT_PORT = os.getenv("QDRANT_PORT")
-    TEMPERATURE = os.getenv("TEMPERATURE")
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    MODEL_NAME = os.getenv("MODEL_NAME")
-    EMBEDDINGS_NAME = os.getenv("EMBEDDINGS_NAME")
+        self.QDRANT_HOST = os.environ.get("QDRANT_HOST")
+        self.QDRANT_PORT = int(os.environ.get("QDRANT_PORT", "6333"))
+        self.QDRANT_GRPC_PORT = int(os.environ.get("QDRANT_GRPC_PORT", "6334"))
+        temperature = os.environ.get("TEMPERATURE")
+        self.TEMPERATURE = (
+            float(temperature) if temperature is not None else None
+        )
+        self.GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
+        self.MODEL_NAME = os.environ.get("MODEL_NAME")
+        # Por padrão usa a versão ONNX quantizada (int8) do modelo multilíngue
+        # distribuída pelo FastEmbed, adequada para textos em português.
+        self.EMBEDDINGS_NAME = os.environ.get(
+            "EMBEDDINGS_NAME",
+            "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+        )
+        self.SPARSE_EMBEDDINGS_NAME = os.environ.get(
+            "SPARSE_EMBEDDINGS_NAME", "Qdrant/bm25"
+        )
+        # Idioma do stemmer e das stopwords do BM25: as súmulas são em português.
+        self.SPARSE_EMBEDDINGS_LANGUAGE = os.environ.get(
+            "SPARSE_EMBEDDINGS_LANGUAGE", "portuguese"
+        )
+        # Quantização dos vetores densos: "scalar" (int8), "binary" ou "none".
+        self.QUANTIZATION = os.environ.get("QUANTIZATION", "scalar").lower()
+        # Parâmetros de construção do índice HNSW de novas coleções.
+        self.HNSW_M = int(os.environ.get("HNSW_M", "32"))
+        self.HNSW_EF_CONSTRUCT = int(
+            os.environ.get("HNSW_EF_CONSTRUCT", "256")
+        )
 
 
 settings = Settings()
@@ -0,0 +1,41 @@
+import pytest
+
+from app.retrieval.classifier import classify_query, select_chunk_types
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("súmula 70", "sumula"),
+        ("o que diz a súmula nº 12?", "sumula"),
+        ("súmulas publicadas em 07/04/14", "data"),
+        ("súmulas alteradas em 07/04/2014", "data"),
+        ("súmulas revogadas antes de 2010", "data"),
+        ("súmula 70 de 2014", "completo"),
+        ("súmulas que citam a Lei 8.666/93", "completo"),
+        ("súmula 70 e a Lei 14.133/2021", "completo"),
+        ("o que diz sobre licitação", "completo"),
+    ],
+)
+def test_classify_query(query, expected):
+    assert classify_query(query) == expected
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("súmula 70", ("conteudo_principal",)),
+        ("precedentes da súmula 70", ("precedentes",)),
+        (
+            "referências normativas da súmula 70",
+            ("referencias_normativas",),
+        ),
+        (
+            "precedentes e referências normativas",
+            ("precedentes", "referencias_normativas"),
+        ),
+        ("Referencia normativa da súmula 12", ("referencias_normativas",)),
+    ],
+)
+def test_select_chunk_types(query, expected):
+    assert select_chunk_types(query) == expected
@@ -0,0 +1,23 @@
+import pytest
+
+from app.ingest.dates import date_to_int
+
+
+@pytest.mark.parametrize(
+    ("data_status", "expected"),
+    [
+        ("07/04/14", 20140407),
+        ("07/04/2014", 20140407),
+        (" 07/04/14 ", 20140407),
+        ("01/01/87", 19870101),
+        ("31/12/99", 19991231),
+        ("01/01/00", 20000101),
+    ],
+)
+def test_date_to_int_converte_para_aaaammdd(data_status, expected):
+    assert date_to_int(data_status) == expected
+
+
+@pytest.mark.parametrize("data_status", [None, "", "abc", "31/02/14"])
+def test_date_to_int_invalida(data_status):
+    assert date_to_int(data_status) is None
@@ -0,0 +1,87 @@
+import pytest
+from langchain_core.structured_query import (
+    Comparator,
+    Comparison,
+    Operation,
+    Operator,
+)
+
+from app.retrieval.fastpath import (
+    fastpath_structured_query,
+    normalize_num_sumula,
+)
+
+
+def _eq(attribute, value):
+    return Comparison(
+        comparator=Comparator.EQ, attribute=attribute, value=value
+    )
+
+
+def _cmp(comparator, value):
+    return Comparison(
+        comparator=comparator, attribute="data_status_num", value=value
+    )
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("súmula 70", _eq("num_sumula", "70")),
+        ("Súmula nº 12", _eq("num_sumula", "12")),
+        ("súmula 070", _eq("num_sumula", "70")),
+        ("súmulas vigentes", _eq("status_atual", "VIGENTE")),
+        ("súmulas antes de 2010", _cmp(Comparator.LT, 20100101)),
+        ("súmulas depois de 2015", _cmp(Comparator.GT, 20151231)),
+        (
+            "súmulas revogadas em 2014",
+            Operation(
+                operator=Operator.AND,
+                arguments=[
+                    _eq("status_atual", "REVOGADA"),
+                    _cmp(Comparator.GTE, 20140101),
+                    _cmp(Comparator.LTE, 20141231),
+                ],
+            ),
+        ),
+    ],
+)
+def test_fastpath_reconhece_formatos_comuns(query, expected):
+    structured_query = fastpath_structured_query(query)
+
+    assert structured_query is not None
+    assert structured_query.filter == expected
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "o que diz sobre licitação",
+        "súmula 70 ou 71",
+        "súmula 70 e 71",
+        "súmula 70 2014",
+        "súmulas não revogadas",
+        "súmulas que não estão vigentes",
+        "súmulas vigentes exceto a súmula 70",
+        "súmulas sem alteradas",
+        "nenhuma súmula revogada antes de 2010",
+        "súmulas publicadas em 07/04/14",
+    ],
+)
+def test_fastpath_deixa_para_o_llm(query):
+    assert fastpath_structured_query(query) is None
+
+
+@pytest.mark.parametrize(
+    ("num_sumula", "expected"),
+    [
+        ("070", "70"),
+        ("70", "70"),
+        (" 7 ", "7"),
+        (70, "70"),
+        ("70-A", "70-A"),
+        (None, None),
+    ],
+)
+def test_normalize_num_sumula_remove_zeros_a_esquerda(num_sumula, expected):
+    assert normalize_num_sumula(num_sumula) == expected